@@ -1,40 +1,16 @@
-from typing import Any
-from langchain_core.callbacks import BaseCallbackHandler
-from langgraph.checkpoint.memory import InMemorySaver
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langgraph_supervisor import create_supervisor
-from agents.code_generator import code_generator_agent
-from agents.project_generator import project_generator_agent
+import argparse
+import asyncio
+import time
+import uuid
+from typing import TYPE_CHECKING, Any
+from agents.registry import registry
 from utils.logger import logger
-from dotenv import load_dotenv
-
-load_dotenv()
-
-supervisor_model = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    temperature=0.2,
-    # max_tokens=2048,
-    timeout=None,
-    max_retries=2
-)
-
-checkpointer = InMemorySaver()
-supervisor = create_supervisor(
-    model=supervisor_model,
-    agents=[project_generator_agent, code_generator_agent],
-    prompt=(
-        """
-        You're an expert manager agent. Your job is to manage two agents that will generate angular code.
-        **INSTRUCTIONS:**
-        - `coder_generator_agent`: The code generator agent. Assign code generation tasks to this agent.
-        - `project_generator_agent`: The project generator agent. Assign project structuring and project structure validation to this agent.
-        * Assign tasks to these agents sequentially, do not call them in parallel.
-        * **DO NOT** do any work yourself.
-        * **DO NOT** use your own angular knowledge. Rely on the agents to do the work.
-        """.strip()
-    ),
-    output_mode="last_message",
-).compile(checkpointer=checkpointer)
+from utils.history import compaction_stats
+from utils.metrics import MetricsHandler, metrics
+from utils.workspace import Workspace, use_workspace
+
+if TYPE_CHECKING:
+    from langgraph.graph.state import CompiledStateGraph
 
 
 message = {
@@ -71,25 +47,117 @@ message = {
 }
 
 
-class CustomHandler(BaseCallbackHandler):
+class CustomHandler(MetricsHandler):
     def on_tool_start(self,
                       serialized: dict[str, Any],
                       input_str: str, **kwargs: Any):
+        super().on_tool_start(serialized, input_str, **kwargs)
         logger.debug("Tool init")
-        logger.debug(f"Serialized: {serialized}")
-        logger.debug(f"Input str: {input_str}")
+        logger.debug("Serialized: %s", serialized)
+        logger.debug("Input str: %s", input_str)
 
     def on_tool_end(self, output: Any, **kwargs: Any):
+        super().on_tool_end(output, **kwargs)
         logger.debug("Tool end")
-        logger.debug(f"Output: {output}")
+        logger.debug("Output: %s", output)
+
+
+async def run_session(message: dict, thread_id: str, resume: bool = False,
+                      graph: "CompiledStateGraph | None" = None):
+    """
+    Function that runs one generation session on the current event loop, in the
+    workspace of its thread (project directory, manifest and derived state).
+
+    Args:
+        message: dict (graph input with the user messages).
+        thread_id: str (conversation id, sessions with different ids run independently).
+        resume: bool (continue the unfinished run saved for the thread instead of starting one).
+        graph: CompiledStateGraph (graph to run, defaults to the supervisor).
+    """
+    workspace = Workspace.for_thread(thread_id)
+    logger.info(f"Session {thread_id} writes the project to {workspace.root}")
+    try:
+        with use_workspace(workspace):
+            await _run_graph(message, thread_id, resume, graph or registry.get("supervisor"))
+    finally:
+        # Waits for the streamed writes still running.
+        await asyncio.to_thread(workspace.close)
+
+
+async def _run_graph(message: dict, thread_id: str, resume: bool, graph: "CompiledStateGraph"):
+    config = {"configurable": {"thread_id": thread_id},
+              "recursion_limit": 50, "callbacks": [CustomHandler()]}
+    if resume:
+        state = await graph.aget_state(config)
+        if not state.next:
+            logger.info(f"Nothing to resume for thread {thread_id}")
+            return
+        logger.info(f"Resuming thread {thread_id} at {state.next}")
+        message = None
+
+    async for chunk in graph.astream(message, config):
+        logger.debug("[%s] %s", thread_id, chunk)
+        if "supervisor" in chunk:
+            supervisor_messages = chunk.get(
+                'supervisor', {}).get('messages', [])
+
+            for supervisor_message in supervisor_messages:
+                logger.debug("[%s] Message", thread_id)
+                logger.debug("---" * 50)
+                logger.debug(supervisor_message.content)
+
+
+async def main(thread_ids: list[str], resume: bool = False):
+    """
+    Function that serves several sessions concurrently from this process.
+
+    Args:
+        thread_ids: list[str] (conversation id of each session).
+        resume: bool (continue the unfinished runs saved for those threads).
+    """
+    results = await asyncio.gather(
+        *(run_session(message, thread_id, resume) for thread_id in thread_ids),
+        return_exceptions=True)
+    for thread_id, result in zip(thread_ids, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Session {thread_id} failed")
+            logger.error(result)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate the Angular project.")
+    parser.add_argument("--sessions", type=int, default=1,
+                        help="concurrent generation sessions, each in its own project directory")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue the unfinished sessions saved by the checkpointer")
+    parser.add_argument("--thread-id", action="append", dest="thread_ids", default=[],
+                        help="conversation id of a session, repeatable (default: new ids)")
+    args = parser.parse_args()
+    if len(set(args.thread_ids)) < len(args.thread_ids):
+        parser.error("each --thread-id can only be given once")
+    if args.resume and not args.thread_ids:
+        parser.error("--resume needs the --thread-id of the sessions to continue")
+    # Fresh runs get new conversations, stored ones are only continued on request.
+    thread_ids = args.thread_ids or [uuid.uuid4().hex for _ in range(args.sessions)]
+    for thread_id in thread_ids:
+        logger.info(f"Session {thread_id} (continue with --resume --thread-id {thread_id})")
+
+    # Models, agents and their heavy imports are only built here, on first use.
+    start = time.perf_counter()
+    registry.get("supervisor")
+    cold_start = time.perf_counter() - start
+    metrics.observe("cold_start_seconds", cold_start)
+    logger.info(f"Supervisor ready in {round(cold_start, 3)} s")
 
+    start = time.perf_counter()
+    asyncio.run(main(thread_ids, args.resume))
+    metrics.observe("run_seconds", time.perf_counter() - start)
 
-for chunk in supervisor.stream(message, {"configurable": {"thread_id": "1"}, "recursion_limit": 50, "callbacks": [CustomHandler()]}):
-    logger.debug(f"{chunk}")
-    if "supervisor" in chunk:
-        supervisor_messages = chunk.get('supervisor', {}).get('messages', [])
+    from utils.llm_cache import llm_cache
 
-        for message in supervisor_messages:
-            logger.debug("Message")
-            logger.debug("---" * 50)
-            logger.debug(message.content)
+    if llm_cache is not None:
+        logger.info(f"LLM cache: {llm_cache.stats()}")
+    for name, stats in compaction_stats.items():
+        logger.info(f"Prompt tokens of {name}: {stats}")
+    logger.info(f"Run metrics:\n{metrics.export()}")
@@ -1,25 +1,26 @@
+from langchain_core.language_models import BaseChatModel
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.prebuilt import create_react_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
 from tools.search_documentation import search_documentation
-from utils.constants import PROJECT_OUTPUT
+from utils.constants import PROJECT_OUTPUT, FILE_OUTPUT_MODE
 from schemas.file import FileGenerated
-from dotenv import load_dotenv
+from utils.context import ContextBuilder
+from utils.file_stream import FileOutputHook, FileStreamHandler
 
-load_dotenv()
+# First rule of the output format, by file output mode (see utils/file_stream.py).
+OUTPUT_FORMATS = {
+    "structured": "* You **MUST** strictly adhere to the `FileGenerated` schema for your output.",
+    "streaming": (
+        "* Your final response **MUST** be a JSON array of `FileGenerated` objects, one per file: "
+        '`[{"path": "...", "content": "..."}]`. Each file is written to disk as soon as its object '
+        "is complete and the other agents only receive its path and hash, so **DO NOT** repeat "
+        "the code anywhere else."
+    ),
+}
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    temperature=0.1,
-    timeout=None,
-    max_retries=1
-)
 
-code_generator_agent = create_react_agent(
-    name="code_generator_agent",
-    model=llm,
-    tools=[search_documentation],
-    response_format=FileGenerated,
-    prompt=(
+def create_prompt(file_output_mode: str = FILE_OUTPUT_MODE) -> str:
+    return (
         f"""
         You are an expert in TypeScript, Angular, and scalable web application development. Your sole purpose is to generate high-quality, maintainable, performant, and accessible Angular code that adheres strictly to the latest Angular and TypeScript best practices.
 
@@ -67,7 +68,7 @@ code_generator_agent = create_react_agent(
                 * **`inject()` Function:** Prefer the `inject()` function for dependency injection within services and components over constructor injection.
 
         4.  **Output Format and Strict Constraints:**
-            * You **MUST** strictly adhere to the `FileGenerated` schema for your output.
+            {OUTPUT_FORMATS[file_output_mode]}
                 * The `path` attribute **must** contain the full, absolute path to the file, including the filename (e.g., `{PROJECT_OUTPUT}/src/app/shared/components/button/button.component.ts`).
                 * The `content` attribute **must** contain the complete, valid, and compilable code for the file.
             * Generate the **absolute minimum code** necessary to fulfill the request while adhering to all best practices.
@@ -81,4 +82,29 @@ code_generator_agent = create_react_agent(
             * After successfully generating the code, respond directly to the supervisor with the results.
         """.strip()
     )
-)
+
+
+def create_code_generator_agent(model: BaseChatModel,
+                                file_output_mode: str = FILE_OUTPUT_MODE) -> CompiledStateGraph:
+    """
+    Function that creates code_generator_agent.
+
+    Args:
+        model: BaseChatModel (agent model, with streaming enabled in streaming mode).
+        file_output_mode: str ("streaming" or "structured").
+    """
+    if file_output_mode not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown file output mode: {file_output_mode}")
+    streaming = file_output_mode == "streaming"
+    agent = create_react_agent(
+        name="code_generator_agent",
+        model=model,
+        tools=[search_documentation],
+        response_format=None if streaming else FileGenerated,
+        # Prompt message and token count prepared once per project root, the hook packs the
+        # rest of each call.
+        pre_model_hook=ContextBuilder("code_generator_agent", create_prompt(file_output_mode)),
+        post_model_hook=FileOutputHook() if streaming else None
+    )
+    # The tokens of every answer go to the handler writing the files as they arrive.
+    return agent.with_config(callbacks=[FileStreamHandler()]) if streaming else agent
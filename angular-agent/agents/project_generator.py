@@ -1,24 +1,24 @@
+from langchain_core.language_models import BaseChatModel
+from langgraph.graph.state import CompiledStateGraph
 from langgraph.prebuilt import create_react_agent
-from langchain_google_genai import ChatGoogleGenerativeAI
-from tools.file_system import search_documentation, create_files_with_schema, check_files, read_file
-from utils.constants import PROJECT_OUTPUT
-from dotenv import load_dotenv
+from tools.file_system import search_documentation, create_files_with_schema, check_files, read_file, \
+    snapshot_files, changed_files, validate_project
+from utils.constants import PROJECT_OUTPUT, FILE_OUTPUT_MODE
+from utils.context import ContextBuilder
 
-load_dotenv()
+# Rule for the files of code_generator_agent, by file output mode (see utils/file_stream.py).
+COMPONENT_FILES = {
+    "structured": "* For Angular Component files, use the name and content provided by the `code_generator_agent`.",
+    "streaming": (
+        "* Angular Component files are already written by the `code_generator_agent`, which only "
+        "reports their `path` and `sha256`: **DO NOT** create them again, only include them in "
+        "the `check_files` calls."
+    ),
+}
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.0-flash",
-    temperature=0,
-    timeout=None,
-    max_retries=1,
-)
 
-project_generator_agent = create_react_agent(
-    name="project_generator_agent",
-    model=llm,
-    tools=[search_documentation, create_files_with_schema, check_files,
-           read_file],
-    prompt=(
+def create_prompt(file_output_mode: str = FILE_OUTPUT_MODE) -> str:
+    return (
         f"""
         You are an expert in file system operations.
         Your ONLY job is to create the project structure and files for the code generated.
@@ -41,13 +41,14 @@ project_generator_agent = create_react_agent(
             * Pass this complete list of absolute file paths (e.g., `{PROJECT_OUTPUT}/src/app/my-component/my-component.component.ts`) to the `check_files` tool.
             * The `check_files` tool will return a list of paths for files that **do not currently exist**.
             * You **MUST** proceed with creating only the files returned by `check_files`. Files that already exist will be skipped to prevent overwriting and save tokens.
+            * If you need to know which files changed during your work, call `snapshot_files` before creating them and `changed_files` with the returned id afterwards, instead of reading the files again.
 
         4.  **Create Project Structure and Files:**
             * Use the `create_files_with_schema` tool to generate the necessary directories and files.
             * This tool expects a list of `FileGenerated` objects, each containing:
                 * `path`: The absolute path to the file (including the filename), strictly adhering to Angular naming conventions.
                 * `content`: The content for the file.
-                    * For Angular Component files, use the name and content provided by the `code_generator_agent`.
+                    {COMPONENT_FILES[file_output_mode]}
                     * For Angular Configuration files (e.g., `angular.json`, `package.json`), provide the **MINIMAL, valid configuration** based on your `search_documentation` findings. Do not include optional or complex configurations unless explicitly required by the user prompt (which is not the case here).
 
         5.  **Post-Creation Verification (CRITICAL):**
@@ -57,6 +58,9 @@ project_generator_agent = create_react_agent(
                 * You **MUST** clearly and explicitly state that the structure was *not* created correctly.
                 * You **MUST** list all the specific files that were expected but are still missing.
                 * You **MUST NOT** claim success if any file is missing.
+            * `create_files_with_schema` also returns a `validation` report of the whole project (invalid JSON configs, unresolved relative imports, unknown component elements). It is computed locally: **DO NOT** read the files back to review them.
+                * If the report has errors, fix **ONLY** the files it lists with another `create_files_with_schema` call, then check its new report. Call `validate_project` to get the report again without writing files.
+                * You **MUST NOT** claim success while the report has errors; list them in your answer instead.
 
         6.  **Scope and Response:**
             * Assist **ONLY** with project structure generation and file creation tasks.
@@ -68,4 +72,25 @@ project_generator_agent = create_react_agent(
             * **DO NOT** use your own knowledge about Angular; rely **exclusively** on the documentation and provided tools.
         """.strip()
     )
-)
+
+
+def create_project_generator_agent(model: BaseChatModel,
+                                   file_output_mode: str = FILE_OUTPUT_MODE) -> CompiledStateGraph:
+    """
+    Function that creates project_generator_agent.
+
+    Args:
+        model: BaseChatModel (agent model).
+        file_output_mode: str ("streaming" or "structured", output mode of code_generator_agent).
+    """
+    if file_output_mode not in COMPONENT_FILES:
+        raise ValueError(f"Unknown file output mode: {file_output_mode}")
+    return create_react_agent(
+        name="project_generator_agent",
+        model=model,
+        tools=[search_documentation, create_files_with_schema, check_files,
+               read_file, snapshot_files, changed_files, validate_project],
+        # Prompt message and token count prepared once per project root, the hook packs the
+        # rest of each call.
+        pre_model_hook=ContextBuilder("project_generator_agent", create_prompt(file_output_mode))
+    )
@@ -0,0 +1,136 @@
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+from utils.constants import FILE_OUTPUT_MODE
+from utils.metrics import metrics
+from utils.logger import logger
+
+# Lazily built models, agents and graphs. Nothing is created (nor are the Gemini client
+# and the agent modules imported) until something asks for it, and every object is
+# then kept for the rest of the process: agents with the same model configuration share
+# one client. The time spent building each component is recorded as `startup_seconds`.
+#
+#   supervisor = registry.get("supervisor")
+
+DEFAULT_MODEL = "gemini-2.0-flash"
+
+
+class Registry:
+    """Builds named components on first use, at most once per process."""
+
+    def __init__(self):
+        self._factories: dict[str, Callable[[], Any]] = {}
+        self._instances: dict[str, Any] = {}
+        # Reentrant: factories get the components they depend on.
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        with self._lock:
+            self._factories[name] = factory
+
+    def get(self, name: str, factory: Callable[[], Any] | None = None) -> Any:
+        """
+        Function that returns a component, building it the first time.
+
+        Args:
+            name: str (component name).
+            factory: Callable[[], Any] (builds the component, defaults to the registered one).
+        """
+        with self._lock:
+            if name in self._instances:
+                return self._instances[name]
+            factory = factory or self._factories.get(name)
+            if factory is None:
+                raise KeyError(f"Unknown component {name}")
+            start = time.perf_counter()
+            instance = factory()
+            seconds = time.perf_counter() - start
+            metrics.observe("startup_seconds", seconds, component=name)
+            logger.debug("Built %s in %.3f s", name, seconds)
+            self._instances[name] = instance
+            return instance
+
+    def built(self) -> list[str]:
+        with self._lock:
+            return list(self._instances)
+
+    def reset(self):
+        with self._lock:
+            self._instances.clear()
+
+
+registry = Registry()
+
+
+def get_model(temperature: float, max_retries: int, max_tokens: int | None = None,
+              model: str = DEFAULT_MODEL, streaming: bool = False):
+    """
+    Function that returns the Gemini chat model for a configuration, shared by every
+    agent using the same one.
+
+    Args:
+        temperature: float (sampling temperature).
+        max_retries: int (retries of a failed call).
+        max_tokens: int | None (maximum output tokens, unlimited when None).
+        model: str (Gemini model name).
+        streaming: bool (stream the answers, token by token, to the callback handlers).
+    """
+    def create():
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from utils.llm_cache import llm_cache
+
+        return ChatGoogleGenerativeAI(
+            model=model,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            timeout=None,
+            max_retries=max_retries,
+            streaming=streaming,
+            cache=llm_cache
+        )
+
+    return registry.get(f"{model} (temperature {temperature}, retries {max_retries}, "
+                        f"max tokens {max_tokens}, streaming {streaming})", create)
+
+
+def _code_generator_agent():
+    from agents.code_generator import create_code_generator_agent
+
+    return create_code_generator_agent(get_model(temperature=0.1, max_retries=1,
+                                                 streaming=FILE_OUTPUT_MODE == "streaming"))
+
+
+def _project_generator_agent():
+    from agents.project_generator import create_project_generator_agent
+
+    return create_project_generator_agent(get_model(temperature=0, max_retries=1))
+
+
+def _code_cleaner_agent():
+    from agents.code_cleaner import create_code_cleaner_agent
+
+    return create_code_cleaner_agent(get_model(temperature=0.2, max_retries=2, max_tokens=3072))
+
+
+def _checkpointer():
+    from utils.checkpointer import create_checkpointer
+
+    return create_checkpointer()
+
+
+def _supervisor():
+    from agents.supervisor import create_supervisor_graph
+
+    return create_supervisor_graph(
+        model=get_model(temperature=0.2, max_retries=2),
+        code_generator=registry.get("code_generator_agent"),
+        project_generator=registry.get("project_generator_agent"),
+    ).compile(checkpointer=registry.get("checkpointer"))
+
+
+registry.register("code_generator_agent", _code_generator_agent)
+registry.register("project_generator_agent", _project_generator_agent)
+registry.register("code_cleaner_agent", _code_cleaner_agent)
+registry.register("checkpointer", _checkpointer)
+registry.register("supervisor", _supervisor)
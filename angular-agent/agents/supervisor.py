@@ -0,0 +1,149 @@
+import asyncio
+import json
+from langchain_core.language_models import BaseChatModel
+from langchain_core.tools import BaseTool, tool
+from langgraph.graph.state import CompiledStateGraph, StateGraph
+from langgraph_supervisor import create_supervisor
+from schemas.file import FileGenerated, FileWriteStatus
+from utils.constants import SUPERVISOR_MODE, CODE_GENERATION_CONCURRENCY
+from utils.file_stream import WRITTEN_FIELDS, parse_written_files
+from utils.history import create_compaction_hook
+from utils.logger import logger
+
+# Supervisor graph over the code and project generator agents.
+#
+# "sequential": the supervisor hands one task at a time to each agent.
+# "parallel": the supervisor splits the request in independent file/component tasks
+# and passes them to the `generate_code` tool, which runs one code_generator_agent per
+# task concurrently and merges their `FileGenerated` results by path (or, in streaming
+# file output mode, the paths and hashes of the files they wrote), then it hands the
+# combined files to project_generator_agent once.
+
+SEQUENTIAL_PROMPT = (
+    """
+        You're an expert manager agent. Your job is to manage two agents that will generate angular code.
+        **INSTRUCTIONS:**
+        - `coder_generator_agent`: The code generator agent. Assign code generation tasks to this agent.
+        - `project_generator_agent`: The project generator agent. Assign project structuring and project structure validation to this agent.
+        * Assign tasks to these agents sequentially, do not call them in parallel.
+        * **DO NOT** do any work yourself.
+        * **DO NOT** use your own angular knowledge. Rely on the agents to do the work.
+        """.strip()
+)
+
+PARALLEL_PROMPT = (
+    """
+        You're an expert manager agent. Your job is to manage two agents that will generate angular code.
+        **INSTRUCTIONS:**
+        - `generate_code`: Tool that runs the code generator agent once per task, concurrently. Split the code generation work in **independent** tasks, one per file or component (e.g., one task for `calculator` and one for `calculator-result`), each describing everything the file needs (names, inputs, outputs) since the tasks cannot see each other. Call it **ONCE** with all the tasks.
+        - `coder_generator_agent`: The code generator agent. Only assign it tasks that depend on code it has to read first.
+        - `project_generator_agent`: The project generator agent. Assign project structuring and project structure validation to this agent. Call it **ONCE** after `generate_code`, with all the generated files.
+        * **DO NOT** do any work yourself.
+        * **DO NOT** use your own angular knowledge. Rely on the agents to do the work.
+        """.strip()
+)
+
+
+def merge_files(tasks: list[str],
+                results: list[list[FileGenerated | FileWriteStatus] | BaseException | None]
+                ) -> list[FileGenerated | FileWriteStatus]:
+    """
+    Function that merges the files generated for each task, sorted by path. When two
+    tasks generate the same path the one of the earliest task is kept, so the result
+    does not depend on which invocation finished first.
+
+    Args:
+        tasks: list[str] (tasks, in the order they were given).
+        results: list[list[FileGenerated | FileWriteStatus] | BaseException | None] (files
+            generated, or written in streaming mode, for each task).
+    """
+    files: dict[str, FileGenerated | FileWriteStatus] = {}
+    for task, result in zip(tasks, results):
+        if isinstance(result, BaseException) or not result:
+            logger.error(f"Code generation failed for task: {task}")
+            logger.error(result)
+            continue
+        for file in result:
+            if file.path in files:
+                # In streaming mode both were already written, the last write is on disk.
+                logger.warning(
+                    f"{file.path} generated by several tasks, keeping the first one")
+                continue
+            files[file.path] = file
+    return [files[path] for path in sorted(files)]
+
+
+async def generate_files(agent: CompiledStateGraph, tasks: list[str],
+                         concurrency: int = CODE_GENERATION_CONCURRENCY
+                         ) -> list[FileGenerated | FileWriteStatus]:
+    """
+    Function that runs one agent invocation per task, at most `concurrency` at a time.
+
+    Args:
+        agent: CompiledStateGraph (code_generator_agent, structured or streaming).
+        tasks: list[str] (independent code generation tasks).
+        concurrency: int (maximum number of invocations running at once).
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def generate(task: str) -> list[FileGenerated | FileWriteStatus]:
+        async with semaphore:
+            result = await agent.ainvoke({"messages": [{"role": "user", "content": task}]})
+        if result.get("structured_response") is not None:
+            return [result["structured_response"]]
+        return parse_written_files(result["messages"][-1].text)
+
+    results = await asyncio.gather(*(generate(task) for task in tasks),
+                                   return_exceptions=True)
+    return merge_files(tasks, results)
+
+
+def create_generate_code_tool(agent: CompiledStateGraph,
+                              concurrency: int = CODE_GENERATION_CONCURRENCY) -> BaseTool:
+    @tool(parse_docstring=True)
+    async def generate_code(tasks: list[str]) -> str:
+        """
+        Generates the code of several independent files or components at the same time.
+        Each task is handled by its own code generator agent, which only sees that task.
+
+        Args:
+            tasks: list[str] (one self-contained description per file or component).
+        """
+        logger.debug("generate_code init")
+
+        files = await generate_files(agent, tasks, concurrency)
+        result = json.dumps([file.model_dump(include=WRITTEN_FIELDS, exclude_none=True)
+                             if isinstance(file, FileWriteStatus) else file.model_dump()
+                             for file in files])
+
+        logger.debug("generate_code end, %s files for %s tasks", len(files), len(tasks))
+
+        return result
+
+    return generate_code
+
+
+def create_supervisor_graph(model: BaseChatModel,
+                            code_generator: CompiledStateGraph,
+                            project_generator: CompiledStateGraph,
+                            mode: str = SUPERVISOR_MODE) -> StateGraph:
+    """
+    Function that creates the (not compiled) supervisor graph.
+
+    Args:
+        model: BaseChatModel (supervisor model).
+        code_generator: CompiledStateGraph (code_generator_agent).
+        project_generator: CompiledStateGraph (project_generator_agent).
+        mode: str ("sequential" or "parallel").
+    """
+    if mode not in ("sequential", "parallel"):
+        raise ValueError(f"Unknown supervisor mode: {mode}")
+    parallel = mode == "parallel"
+    return create_supervisor(
+        model=model,
+        agents=[project_generator, code_generator],
+        tools=[create_generate_code_tool(code_generator)] if parallel else None,
+        prompt=PARALLEL_PROMPT if parallel else SEQUENTIAL_PROMPT,
+        pre_model_hook=create_compaction_hook("supervisor"),
+        output_mode="last_message",
+    )
@@ -0,0 +1,103 @@
+import argparse
+import tempfile
+import time
+from retrieval.bm25 import BM25Index
+from retrieval.markdown import HEADING_PATTERN, update_fence
+from retrieval.sources import ANGULAR_DOCUMENTATION
+from retrieval.streaming import iter_source, iter_chunks
+from utils.tokens import count_tokens
+
+# Compares the recursive character splitter with the markdown chunker on
+# documentation/angular-llm.txt: chunk count, split time, chunks cutting through a
+# code fence and BM25 hit-rate on a fixed query set (a hit is a top-k chunk that
+# overlaps the section answering the query) with the tokens returned per query.
+# Runs offline.
+#
+#   python -m benchmarks.chunking
+
+QUERIES = [
+    ("declare a required input", "#### Required inputs"),
+    ("defer block with placeholder and loading", "### `@defer`"),
+    ("lightweight injection tokens", "## Using lightweight injection tokens"),
+    ("generate form controls with FormBuilder", "## Using the FormBuilder service to generate controls"),
+    ("write a custom validator", "## Defining custom validators"),
+    ("what is hydration", "## What is hydration"),
+    ("override a component in tests", "### The `overrideComponent` method"),
+    ("HttpClient fetch options", "### Fetch options"),
+    ("http interceptors", "# Interceptors"),
+    ("linkedSignal dependent state", "# Dependent state with `linkedSignal`"),
+    ("NgOptimizedImage getting started", "# Getting started with NgOptimizedImage"),
+    ("readonly properties initialized by Angular", "### Use `readonly` on properties that are initialized by Angular"),
+    ("eagerly loaded route components", "### Eagerly loaded components"),
+    ("structural directives", "# Structural directives"),
+    ("interfaces in dependency injection", "### Interfaces and DI"),
+    ("animating state and styles", "### Animating State and Styles"),
+]
+
+
+def broken_fences(text: str) -> bool:
+    fence = None
+    for line in text.splitlines():
+        fence = update_fence(line, fence)
+    return fence is not None
+
+
+def section_span(text: str, heading: str) -> tuple[int, int]:
+    """
+    Function that returns the character range of the section starting at a heading,
+    up to the next heading of the same or a higher level.
+
+    Args:
+        text: str (markdown document).
+        heading: str (heading line, including its `#` marks).
+    """
+    start = text.index(heading + "\n")
+    level = len(heading) - len(heading.lstrip("#"))
+    position = start + len(heading) + 1
+    fence = None
+    for line in text[position:].splitlines(keepends=True):
+        match = HEADING_PATTERN.match(line) if fence is None else None
+        if match is not None and len(match.group(1)) <= level:
+            break
+        fence = update_fence(line, fence)
+        position += len(line)
+    return start, position
+
+
+def run(chunker: str, k: int) -> dict[str, float]:
+    start = time.perf_counter()
+    chunks = list(iter_chunks(iter_source(ANGULAR_DOCUMENTATION), chunker=chunker))
+    split_seconds = time.perf_counter() - start
+
+    with open(ANGULAR_DOCUMENTATION.paths[0], mode='r', encoding='utf-8') as file:
+        text = file.read()
+    with tempfile.TemporaryDirectory() as path:
+        index = BM25Index.build(f"{path}/index", chunks)
+        hits = 0
+        tokens = 0
+        for query, heading in QUERIES:
+            start, end = section_span(text, heading)
+            results = index.similarity_search(query, k)
+            tokens += sum(count_tokens(doc.page_content) for doc in results)
+            hits += any(doc.metadata["start_index"] < end and
+                        doc.metadata["start_index"] + len(doc.page_content) > start
+                        for doc in results)
+
+    return {
+        "chunks": len(chunks),
+        "split_ms": 1000 * split_seconds,
+        "broken_fences": sum(broken_fences(chunk.page_content) for chunk in chunks),
+        "hit_rate": hits / len(QUERIES),
+        "tokens_per_query": tokens / len(QUERIES),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the documentation chunkers.")
+    parser.add_argument("-k", type=int, default=4)
+    args = parser.parse_args()
+
+    for chunker in ("recursive", "markdown"):
+        results = run(chunker, args.k)
+        print(f"{chunker}: " + ", ".join(f"{name} {round(value, 3)}" for name, value in results.items()))
@@ -0,0 +1,294 @@
+import argparse
+import asyncio
+import atexit
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+
+# Offline benchmark suite: the Gemini chat models are replaced by scripted stub models
+# (benchmarks/stub_model.py, benchmarks/supervisor.py) and the Gemini embeddings by the
+# hash embedder, so every run is deterministic and needs no network nor API key. It
+# measures the cold start and the supervisor flow of agent.py, the chunkers, the index
+# builds, the retrieval latency of each mode and the file writing throughput.
+#
+# Every run appends one JSON line per benchmark to `--results` and is compared with the
+# latest run of another commit: metrics more than `--threshold` worse are reported as
+# regressions (exit code 1 with `--fail-on-regression`).
+#
+#   python -m benchmarks.run
+#   python -m benchmarks.run supervisor retrieval --latency 0.1
+
+# Set before the project modules read them: everything is written to a temporary
+# directory and nothing is sent to Google.
+WORK_DIR = tempfile.mkdtemp(prefix="angular-agent-benchmarks-")
+atexit.register(shutil.rmtree, WORK_DIR, ignore_errors=True)
+# The Gemini clients of the startup benchmark are built, never called.
+os.environ.setdefault("GOOGLE_API_KEY", "offline")
+os.environ["EMBEDDING_MODEL"] = "local"
+os.environ["DOCUMENTATION_INDEX_DIR"] = os.path.join(WORK_DIR, "index")
+os.environ["CHECKPOINT_PATH"] = os.path.join(WORK_DIR, "checkpoints.sqlite")
+os.environ["LLM_CACHE_PATH"] = ""
+os.environ["METRICS_PATH"] = ""
+os.environ["METRICS_PROMETHEUS_PATH"] = ""
+
+from benchmarks import chunking  # noqa: E402
+from benchmarks.supervisor import create_offline_supervisor  # noqa: E402
+from utils.constants import CACHE_DIR  # noqa: E402
+
+RESULTS_PATH = os.path.join(CACHE_DIR, "benchmarks.jsonl")
+REGRESSION_THRESHOLD = 0.2
+BENCHMARKS = ["startup", "index", "retrieval", "chunking", "file_writer", "supervisor"]
+AGENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a new interpreter, so nothing is imported yet.
+STARTUP_SCRIPT = """
+import time
+start = time.perf_counter()
+import agent
+imported = time.perf_counter()
+agent.registry.get("supervisor")
+print(imported - start, time.perf_counter() - start)
+"""
+
+# Direction of a metric, from the end of its name. Other metrics are only reported.
+LOWER_IS_BETTER = ("_ms", "_s", "_seconds")
+HIGHER_IS_BETTER = ("_per_second", "hit_rate")
+
+
+def percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def timed(function: Callable[[], object]) -> float:
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+
+def bench_startup(repeat: int) -> dict[str, float]:
+    imports, cold_starts = [], []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=AGENT_DIR,
+                                capture_output=True, text=True, check=True).stdout
+        imported, ready = map(float, output.split()[-2:])
+        imports.append(imported)
+        cold_starts.append(ready)
+    return {"import_s": statistics.median(imports),
+            "cold_start_s": statistics.median(cold_starts)}
+
+
+def bench_supervisor(tasks: int, latency: float) -> dict[str, float]:
+    import agent
+    from retrieval.search import search
+    from retrieval.sources import ANGULAR_DOCUMENTATION
+
+    # Loads the index searched by code_generator_agent, so no mode pays for it.
+    search(ANGULAR_DOCUMENTATION, chunking.QUERIES[0][0])
+    results = {}
+    for file_output in ("streaming", "structured"):
+        for mode in ("sequential", "parallel"):
+            with tempfile.TemporaryDirectory(dir=WORK_DIR) as output_dir:
+                graph = create_offline_supervisor(
+                    mode, [f"Generate component number {i}" for i in range(tasks)],
+                    latency, output_dir, file_output
+                ).compile(checkpointer=agent.registry.get("checkpointer"))
+                seconds = timed(lambda: asyncio.run(agent.run_session(
+                    agent.message, f"benchmark-{file_output}-{mode}", graph=graph)))
+                written = sum(len(names) for _, _, names in os.walk(output_dir))
+            assert written == tasks, f"{mode}: {written} files written for {tasks} tasks"
+            # Streaming is the default mode, its metrics keep the names of the earlier runs.
+            suffix = "" if file_output == "streaming" else f"_{file_output}"
+            results[f"{mode}{suffix}_s"] = seconds
+    return results
+
+
+def bench_chunking(k: int) -> dict[str, float]:
+    results = {}
+    for chunker in ("recursive", "markdown"):
+        for name, value in chunking.run(chunker, k).items():
+            results[f"{chunker}_{name}"] = value
+    return results
+
+
+def bench_index() -> dict[str, float]:
+    from retrieval import bm25, index
+    from retrieval.sources import ANGULAR_DOCUMENTATION
+
+    # Cold build, even when an earlier benchmark already loaded the indexes.
+    shutil.rmtree(os.environ["DOCUMENTATION_INDEX_DIR"], ignore_errors=True)
+    bm25._indexes.clear()
+    index._indexes.clear()
+    results = {
+        "bm25_build_s": timed(lambda: bm25.get_bm25_index(ANGULAR_DOCUMENTATION)),
+        "dense_build_s": timed(lambda: index.get_index(ANGULAR_DOCUMENTATION)),
+    }
+    bm25._indexes.clear()
+    index._indexes.clear()
+    results["bm25_load_ms"] = 1000 * timed(lambda: bm25.get_bm25_index(ANGULAR_DOCUMENTATION))
+    results["dense_load_ms"] = 1000 * timed(lambda: index.get_index(ANGULAR_DOCUMENTATION))
+    results["chunks"] = index.get_index(ANGULAR_DOCUMENTATION).manifest["documents"]
+    return results
+
+
+def bench_retrieval(k: int, repeat: int) -> dict[str, float]:
+    from retrieval.cache import query_cache
+    from retrieval.search import search
+    from retrieval.sources import ANGULAR_DOCUMENTATION
+
+    results = {}
+    for mode in ("lexical", "dense", "hybrid"):
+        # Loads the indexes, so the timings only cover the search.
+        search(ANGULAR_DOCUMENTATION, chunking.QUERIES[0][0], k, mode)
+        latencies = []
+        for _ in range(repeat):
+            for query, _ in chunking.QUERIES:
+                query_cache.invalidate()
+                latencies.append(1000 * timed(
+                    lambda: search(ANGULAR_DOCUMENTATION, query, k, mode)))
+        for query, _ in chunking.QUERIES:
+            search(ANGULAR_DOCUMENTATION, query, k, mode)
+        cached = [1000 * timed(lambda: search(ANGULAR_DOCUMENTATION, query, k, mode))
+                  for query, _ in chunking.QUERIES]
+        results[f"{mode}_p50_ms"] = statistics.median(latencies)
+        results[f"{mode}_p95_ms"] = percentile(latencies, 0.95)
+        results[f"{mode}_cached_ms"] = statistics.median(cached)
+    return results
+
+
+def bench_file_writer(count: int, size: int) -> dict[str, float]:
+    from utils.file_writer import write_files
+
+    with tempfile.TemporaryDirectory(dir=WORK_DIR) as output_dir:
+        files = [(os.path.join(output_dir, "src", "app", f"component-{i % 10}", f"file-{i}.ts"),
+                  f"// file {i}\n" + "x" * size) for i in range(count)]
+        created = timed(lambda: write_files(files))
+        unchanged = timed(lambda: write_files(files))
+    return {"created_files_per_second": count / created,
+            "unchanged_files_per_second": count / unchanged}
+
+
+def current_commit() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def load_baseline(path: str, commit: str) -> dict[str, dict]:
+    """
+    Function that returns, per benchmark, the latest stored run of another commit.
+
+    Args:
+        path: str (JSON lines results file).
+        commit: str (commit of the current run).
+    """
+    baseline = {}
+    if not os.path.isfile(path):
+        return baseline
+    with open(path, mode='r', encoding='utf-8') as file:
+        for line in file:
+            record = json.loads(line)
+            if record["commit"] != commit:
+                baseline[record["benchmark"]] = record
+    return baseline
+
+
+def regression(metric: str, value: float, previous: float, threshold: float) -> float | None:
+    """
+    Function that returns the relative change of a metric when it got worse by more
+    than the threshold, None otherwise.
+
+    Args:
+        metric: str (metric name, its suffix gives the direction).
+        value: float (current value).
+        previous: float (value of the baseline run).
+        threshold: float (tolerated relative change).
+    """
+    if previous <= 0:
+        return None
+    change = (value - previous) / previous
+    if metric.endswith(LOWER_IS_BETTER) and change > threshold:
+        return change
+    if metric.endswith(HIGHER_IS_BETTER) and -change > threshold:
+        return change
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Run the offline benchmark suite and compare it with the previous commit.")
+    parser.add_argument("benchmarks", nargs="*",
+                        help=f"benchmarks to run, among {', '.join(BENCHMARKS)} (default: all)")
+    parser.add_argument("--tasks", type=int, default=4,
+                        help="files generated in the supervisor benchmark")
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="seconds per stub model call")
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="passes over the queries in the retrieval benchmark")
+    parser.add_argument("--files", type=int, default=500,
+                        help="files written in the file writer benchmark")
+    parser.add_argument("--results", default=RESULTS_PATH,
+                        help="JSON lines file the runs are appended to")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="relative change reported as a regression")
+    parser.add_argument("--no-save", action="store_true",
+                        help="compare without storing the run")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    # The retrieval and supervisor benchmarks reuse the indexes built by the index one.
+    runners = {
+        "startup": lambda: bench_startup(3),
+        "index": bench_index,
+        "retrieval": lambda: bench_retrieval(args.k, args.repeat),
+        "chunking": lambda: bench_chunking(args.k),
+        "file_writer": lambda: bench_file_writer(args.files, 2000),
+        "supervisor": lambda: bench_supervisor(args.tasks, args.latency),
+    }
+    commit = current_commit()
+    date = time.strftime("%Y-%m-%dT%H:%M:%S")
+    baseline = load_baseline(args.results, commit)
+    regressions = []
+    records = []
+    for name in runners:
+        if args.benchmarks and name not in args.benchmarks:
+            continue
+        results = runners[name]()
+        records.append({"commit": commit, "date": date, "benchmark": name, "results": results})
+        previous = baseline.get(name, {})
+        print(f"{name}" + (f" (baseline {previous['commit']})" if previous else ""))
+        for metric, value in results.items():
+            before = previous.get("results", {}).get(metric)
+            line = f"  {metric:<32} {value:>12.3f}"
+            if before is not None:
+                line += f" {before:>12.3f}"
+                change = regression(metric, value, before, args.threshold)
+                if change is not None:
+                    line += f"  REGRESSION {change:+.0%}"
+                    regressions.append(f"{name}.{metric}")
+            print(line)
+
+    if not args.no_save:
+        os.makedirs(os.path.dirname(args.results) or ".", exist_ok=True)
+        with open(args.results, mode='a', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record) + "\n")
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+        if args.fail_on_regression:
+            raise SystemExit(1)
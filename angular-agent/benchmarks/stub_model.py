@@ -0,0 +1,65 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator, Callable, Sequence
+from typing import Any
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import Runnable, RunnableLambda
+from pydantic import BaseModel
+
+# Chat model for offline benchmarks: every call waits `latency` seconds (standing in
+# for the model round trip) and answers with `respond(messages)`. Structured output
+# returns `structured(schema, messages)`. With `streaming`, answers arrive in chunks of
+# `chunk_size` characters spread over the latency.
+
+
+class StubChatModel(BaseChatModel):
+    respond: Callable[[list[BaseMessage]], AIMessage]
+    structured: Callable[[type[BaseModel], list[BaseMessage]], BaseModel] | None = None
+    latency: float = 0.0
+    streaming: bool = False
+    chunk_size: int = 64
+
+    @property
+    def _llm_type(self) -> str:
+        return "stub"
+
+    def _generate(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                  run_manager: CallbackManagerForLLMRun | None = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages))])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                         run_manager: AsyncCallbackManagerForLLMRun | None = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=self.respond(messages))])
+
+    async def _astream(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                       run_manager: AsyncCallbackManagerForLLMRun | None = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        message = self.respond(messages)
+        pieces = [message.content[i:i + self.chunk_size]
+                  for i in range(0, len(message.content), self.chunk_size)] or [""]
+        for i, piece in enumerate(pieces):
+            await asyncio.sleep(self.latency / len(pieces))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(
+                content=piece, tool_calls=message.tool_calls if i == 0 else []))
+            if run_manager:
+                await run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+
+    def bind_tools(self, tools: Sequence[Any], **kwargs: Any) -> "StubChatModel":
+        return self
+
+    def with_structured_output(self, schema: type[BaseModel], **kwargs: Any) -> Runnable:
+        def generate(messages: list[BaseMessage]) -> BaseModel:
+            time.sleep(self.latency)
+            return self.structured(schema, messages)
+
+        async def agenerate(messages: list[BaseMessage]) -> BaseModel:
+            await asyncio.sleep(self.latency)
+            return self.structured(schema, messages)
+
+        return RunnableLambda(generate, afunc=agenerate)
@@ -0,0 +1,171 @@
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import tempfile
+import time
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from benchmarks.stub_model import StubChatModel
+from agents.code_generator import create_code_generator_agent
+from agents.project_generator import create_project_generator_agent
+from agents.supervisor import create_supervisor_graph
+from utils.constants import FILE_OUTPUT_MODE
+
+# Wall-clock time of the supervisor graph in sequential and parallel mode with stub
+# models that take `--latency` seconds per call. The supervisor asks for one file per
+# task (sequentially or through the `generate_code` fan-out tool), code_generator_agent
+# searches the bundled documentation before answering, and then project_generator_agent
+# checks, writes (to a temporary directory) and checks again the generated files. In
+# streaming file output mode the code generator answers are streamed and written as they
+# arrive, and the project generator only checks them. Runs offline.
+#
+#   python -m benchmarks.supervisor --tasks 4 --latency 0.2
+
+
+def tool_call(name: str, args: dict | None = None) -> AIMessage:
+    return AIMessage(content="", tool_calls=[
+        {"name": name, "args": args or {}, "id": f"call_{time.perf_counter_ns()}"}])
+
+
+def supervisor_policy(tasks: list[str], mode: str):
+    def respond(messages: list[BaseMessage]) -> AIMessage:
+        # Answers, not the handoff back to the supervisor.
+        generated = sum(isinstance(message, AIMessage) and message.name == "code_generator_agent"
+                        and not message.tool_calls for message in messages)
+        fanned_out = any(isinstance(message, ToolMessage) and message.name == "generate_code"
+                         for message in messages)
+        project = any(isinstance(message, AIMessage) and message.name == "project_generator_agent"
+                      for message in messages)
+        if mode == "parallel" and not fanned_out:
+            return tool_call("generate_code", {"tasks": tasks})
+        if mode == "sequential" and generated < len(tasks):
+            return tool_call("transfer_to_code_generator_agent")
+        if not project:
+            return tool_call("transfer_to_project_generator_agent")
+        return AIMessage(content="Project created")
+
+    return respond
+
+
+def since_handoff(messages: list[BaseMessage], agent: str) -> list[BaseMessage]:
+    """
+    Function that returns the messages of the current turn of an agent: the ones after
+    the last handoff to it, or all of them when it was invoked directly.
+
+    Args:
+        messages: list[BaseMessage] (history seen by the agent).
+        agent: str (agent name).
+    """
+    for index in range(len(messages) - 1, -1, -1):
+        if isinstance(messages[index], ToolMessage) and messages[index].name == f"transfer_to_{agent}":
+            return messages[index + 1:]
+    return messages
+
+
+def code_generator_policy(output_dir: str):
+    answers = itertools.count()
+
+    def respond(messages: list[BaseMessage]) -> AIMessage:
+        task = [message for message in messages if isinstance(message, HumanMessage)][-1]
+        searched = any(isinstance(message, ToolMessage) and message.name == "search_documentation"
+                       for message in since_handoff(messages, "code_generator_agent"))
+        if not searched:
+            return tool_call("search_documentation", {"query": task.content[:200]})
+        return AIMessage(content=json.dumps(
+            [{"path": f"{output_dir}/src/app/file-{next(answers)}.ts", "content": task.content}]))
+
+    return respond
+
+
+def generated_files(messages: list[BaseMessage]) -> list[dict[str, str]]:
+    # generate_code results in parallel mode, code_generator_agent answers in sequential
+    # mode: files with their content, or only their path and hash when already streamed.
+    files = {}
+    for message in messages:
+        if isinstance(message, ToolMessage) and message.name == "generate_code" or \
+                isinstance(message, AIMessage) and message.name == "code_generator_agent" \
+                and message.content.startswith("["):
+            for file in json.loads(message.content):
+                files[file["path"]] = file
+    return list(files.values())
+
+
+def project_generator_policy(messages: list[BaseMessage]) -> AIMessage:
+    files = generated_files(messages)
+    paths = [file["path"] for file in files]
+    created = [{"path": file["path"], "content": file["content"]}
+               for file in files if "content" in file]
+    steps = [tool_call("check_files", {"file_names": paths})]
+    if created:
+        steps.append(tool_call("create_files_with_schema", {"files": created}))
+    steps.append(tool_call("check_files", {"file_names": paths}))
+    done = sum(isinstance(message, ToolMessage) and
+               message.name in ("check_files", "create_files_with_schema")
+               for message in since_handoff(messages, "project_generator_agent"))
+    if done < len(steps):
+        return steps[done]
+    return AIMessage(content=f"Project created with {len(files)} files")
+
+
+def generated_file(schema, messages: list[BaseMessage]):
+    answer = [message for message in messages if isinstance(message, AIMessage)][-1]
+    return schema(**json.loads(answer.content)[0])
+
+
+def create_offline_supervisor(mode: str, tasks: list[str], latency: float, output_dir: str,
+                              file_output_mode: str = FILE_OUTPUT_MODE):
+    """
+    Function that creates the (not compiled) supervisor graph with the real agents and
+    tools driven by scripted stub models.
+
+    Args:
+        mode: str ("sequential" or "parallel").
+        tasks: list[str] (one code generation task per file).
+        latency: float (seconds each model call takes).
+        output_dir: str (directory the generated files are written to).
+        file_output_mode: str ("streaming" or "structured").
+    """
+    return create_supervisor_graph(
+        model=StubChatModel(respond=supervisor_policy(
+            tasks, mode), latency=latency),
+        code_generator=create_code_generator_agent(StubChatModel(
+            respond=code_generator_policy(output_dir), structured=generated_file,
+            latency=latency, streaming=file_output_mode == "streaming"), file_output_mode),
+        project_generator=create_project_generator_agent(StubChatModel(
+            respond=project_generator_policy, latency=latency), file_output_mode),
+        mode=mode,
+    )
+
+
+async def run(mode: str, tasks: list[str], latency: float,
+              file_output_mode: str = FILE_OUTPUT_MODE) -> float:
+    with tempfile.TemporaryDirectory() as output_dir:
+        supervisor = create_offline_supervisor(mode, tasks, latency, output_dir, file_output_mode) \
+            .compile(checkpointer=InMemorySaver())
+
+        start = time.perf_counter()
+        await supervisor.ainvoke(
+            {"messages": [{"role": "user", "content": "Generate the components"}]},
+            {"configurable": {"thread_id": mode}, "recursion_limit": 100})
+        seconds = time.perf_counter() - start
+
+        written = [name for _, _, names in os.walk(output_dir) for name in names]
+        assert len(written) == len(tasks), f"{len(written)} files written for {len(tasks)} tasks"
+    return seconds
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the sequential and parallel supervisor modes.")
+    parser.add_argument("--tasks", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--file-output", default=FILE_OUTPUT_MODE,
+                        help="code generator output mode, streaming or structured")
+    args = parser.parse_args()
+
+    tasks = [f"Generate component number {i}" for i in range(args.tasks)]
+    for mode in ("sequential", "parallel"):
+        seconds = asyncio.run(run(mode, tasks, args.latency, args.file_output))
+        print(f"{mode}: {round(seconds, 3)} s")
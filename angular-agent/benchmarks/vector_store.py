@@ -0,0 +1,73 @@
+import argparse
+import time
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.vectorstores import InMemoryVectorStore
+from retrieval.streaming import iter_source, iter_chunks
+from retrieval.sources import ANGULAR_DOCUMENTATION
+from retrieval.vector_store import NumpyVectorStore
+
+# Compares InMemoryVectorStore with NumpyVectorStore on the chunks produced from
+# documentation/angular-llm.txt by the configured chunker (DOCUMENTATION_CHUNKER,
+# markdown by default), the chunks the documentation index is built from.
+# Embeddings are deterministic fakes with the dimensions of models/embedding-001,
+# so no network is needed.
+#
+#   python -m benchmarks.vector_store
+
+DIMENSIONS = 768
+
+
+def timed(function, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function()
+    return (time.perf_counter() - start) / repeat
+
+
+def run(queries: int, k: int, repeat: int) -> dict[str, float]:
+    chunks = list(iter_chunks(iter_source(ANGULAR_DOCUMENTATION)))
+    embedder = DeterministicFakeEmbedding(size=DIMENSIONS)
+    vectors = embedder.embed_documents([chunk.page_content for chunk in chunks])
+    query_vectors = [embedder.embed_query(f"query {i}") for i in range(queries)]
+
+    in_memory = InMemoryVectorStore(embedder)
+    in_memory.add_texts([chunk.page_content for chunk in chunks],
+                        metadatas=[chunk.metadata for chunk in chunks])
+    # Reuse the precomputed vectors so both stores index identical embeddings.
+    for entry, vector in zip(in_memory.store.values(), vectors):
+        entry["vector"] = vector
+    numpy_store = NumpyVectorStore.from_vectors(vectors, chunks)
+
+    expected = [doc.page_content for doc in in_memory.similarity_search_by_vector(
+        query_vectors[0], k)]
+    actual = [doc.page_content for doc in numpy_store.similarity_search_by_vector(
+        query_vectors[0], k)]
+    assert expected == actual, "stores disagree on the top-k results"
+
+    return {
+        "chunks": len(chunks),
+        "in_memory_single_ms": 1000 * timed(
+            lambda: in_memory.similarity_search_by_vector(query_vectors[0], k), repeat),
+        "numpy_single_ms": 1000 * timed(
+            lambda: numpy_store.similarity_search_by_vector(query_vectors[0], k), repeat),
+        "in_memory_batch_ms": 1000 * timed(
+            lambda: [in_memory.similarity_search_by_vector(vector, k) for vector in query_vectors], repeat),
+        "numpy_batch_ms": 1000 * timed(
+            lambda: numpy_store.similarity_search_by_vectors(np.asarray(query_vectors), k), repeat),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the documentation vector stores.")
+    parser.add_argument("--queries", type=int, default=32,
+                        help="queries in the batched run")
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    results = run(args.queries, args.k, args.repeat)
+    print(f"chunks: {results.pop('chunks')}, k: {args.k}, batch: {args.queries}")
+    for name, value in results.items():
+        print(f"{name}: {value:.3f}")
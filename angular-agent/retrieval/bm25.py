@@ -0,0 +1,228 @@
+import argparse
+import heapq
+import json
+import math
+import os
+import re
+import shutil
+import threading
+from array import array
+from collections import Counter
+from collections.abc import Iterable, Sequence
+from langchain_core.documents import Document
+from retrieval.cache import query_cache
+from retrieval.index import index_key
+from retrieval.streaming import iter_source, iter_chunks, JsonlDocumentWriter, JsonlDocuments
+from retrieval.sources import DocumentationSource, SOURCES, ANGULAR_DOCUMENTATION
+from utils.constants import DOCUMENTATION_INDEX_DIR
+from utils.metrics import metrics
+from utils.logger import logger
+
+# Offline lexical (BM25) index over the same chunks as the dense index.
+#
+# Stored in `DOCUMENTATION_INDEX_DIR/<source>-bm25-<key>/`:
+#   - manifest.json: build parameters and corpus statistics.
+#   - lexicon.json: term -> [document frequency, postings offset].
+#   - postings.bin: uint32 document ids followed by uint32 term frequencies,
+#     one contiguous run per term.
+#   - lengths.bin: uint32 token count of every chunk.
+#   - documents.jsonl, documents.idx: chunks and their byte offsets.
+
+K1 = 1.2
+B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOP_WORDS = frozenset((
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "in",
+    "is", "it", "of", "on", "or", "that", "the", "this", "to", "with", "you", "your"
+))
+
+_indexes: dict[str, "BM25Index"] = {}
+_lock = threading.Lock()
+
+
+def tokenize(text: str) -> list[str]:
+    return [token for token in TOKEN_PATTERN.findall(text.lower())
+            if token not in STOP_WORDS]
+
+
+class BM25Index:
+    """Inverted index with precomputed BM25 term statistics."""
+
+    def __init__(self, manifest: dict, lexicon: dict[str, list[int]],
+                 postings: array, lengths: array, documents: Sequence[Document]):
+        self.manifest = manifest
+        self.lexicon = lexicon
+        self.postings = postings
+        self.lengths = lengths
+        self.documents = documents
+        self.average_length = manifest["average_length"] or 1.0
+
+    @property
+    def key(self) -> str:
+        return self.manifest["key"]
+
+    @classmethod
+    def build(cls, path: str, chunks: Iterable[Document], key: str = "") -> "BM25Index":
+        """
+        Function that builds and persists the inverted index, streaming the chunks
+        to disk as they are tokenized.
+
+        Args:
+            path: str (index directory).
+            chunks: Iterable[Document] (chunks to index).
+            key: str (content address of the chunks).
+        """
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(tmp_path, exist_ok=True)
+
+        term_postings: dict[str, list[tuple[int, int]]] = {}
+        lengths = array("I")
+        with JsonlDocumentWriter(tmp_path) as writer:
+            for doc_id, chunk in enumerate(chunks):
+                writer.write(chunk)
+                # Markdown chunks are also matched on the headings they belong to.
+                tokens = tokenize(
+                    f"{chunk.metadata.get('headings', '')}\n{chunk.page_content}")
+                lengths.append(len(tokens))
+                for term, frequency in Counter(tokens).items():
+                    term_postings.setdefault(term, []).append((doc_id, frequency))
+
+        lexicon = {}
+        ids = array("I")
+        frequencies = array("I")
+        for term in sorted(term_postings):
+            entries = term_postings[term]
+            lexicon[term] = [len(entries), len(ids)]
+            for doc_id, frequency in entries:
+                ids.append(doc_id)
+                frequencies.append(frequency)
+
+        manifest = {
+            "key": key,
+            "documents": len(lengths),
+            "terms": len(lexicon),
+            "postings": len(ids),
+            "average_length": sum(lengths) / len(lengths) if lengths else 0.0,
+            "k1": K1,
+            "b": B,
+        }
+        with open(os.path.join(tmp_path, "manifest.json"), mode='w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2)
+        with open(os.path.join(tmp_path, "lexicon.json"), mode='w', encoding='utf-8') as file:
+            json.dump(lexicon, file, separators=(",", ":"))
+        with open(os.path.join(tmp_path, "postings.bin"), mode='wb') as file:
+            ids.tofile(file)
+            frequencies.tofile(file)
+        with open(os.path.join(tmp_path, "lengths.bin"), mode='wb') as file:
+            lengths.tofile(file)
+
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        return cls.load(path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(os.path.join(path, "manifest.json"), mode='r', encoding='utf-8') as file:
+            manifest = json.load(file)
+        with open(os.path.join(path, "lexicon.json"), mode='r', encoding='utf-8') as file:
+            lexicon = json.load(file)
+        postings = array("I")
+        with open(os.path.join(path, "postings.bin"), mode='rb') as file:
+            postings.fromfile(file, 2 * manifest["postings"])
+        lengths = array("I")
+        with open(os.path.join(path, "lengths.bin"), mode='rb') as file:
+            lengths.fromfile(file, manifest["documents"])
+        return cls(manifest, lexicon, postings, lengths, JsonlDocuments(path))
+
+    def scores(self, query: str) -> dict[int, float]:
+        """
+        Function that returns the BM25 score of every chunk matching the query.
+
+        Args:
+            query: str (text to search for).
+        """
+        total = len(self.documents)
+        frequencies_offset = self.manifest["postings"]
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            entry = self.lexicon.get(term)
+            if entry is None:
+                continue
+            df, offset = entry
+            idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+            for i in range(offset, offset + df):
+                doc_id = self.postings[i]
+                tf = self.postings[frequencies_offset + i]
+                norm = K1 * (1 - B + B *
+                             self.lengths[doc_id] / self.average_length)
+                scores[doc_id] = scores.get(
+                    doc_id, 0.0) + idf * tf * (K1 + 1) / (tf + norm)
+        return scores
+
+    def search_ids(self, query: str, k: int = 4) -> list[tuple[int, float]]:
+        return heapq.nlargest(k, self.scores(query).items(), key=lambda item: item[1])
+
+    def similarity_search(self, query: str, k: int = 4) -> list[Document]:
+        """
+        Function that returns the `k` chunks with the highest BM25 score.
+
+        Args:
+            query: str (text to search for).
+            k: int (number of chunks to return).
+        """
+        with metrics.timer("retrieval_seconds", stage="search", index="lexical"):
+            return [self.documents[doc_id] for doc_id, _ in self.search_ids(query, k)]
+
+
+def get_bm25_index(source: DocumentationSource, rebuild: bool = False) -> BM25Index:
+    """
+    Function that returns the lexical index of a source, building it only when no
+    index exists for the current corpus and chunking parameters.
+
+    Args:
+        source: DocumentationSource (source to index).
+        rebuild: bool (refetch remote documents and rebuild the index).
+    """
+    with _lock:
+        if not rebuild and source.name in _indexes:
+            return _indexes[source.name]
+        if rebuild:
+            query_cache.invalidate(source.name)
+
+        key = index_key(iter_source(source, refresh=rebuild), model="bm25")
+        path = os.path.join(DOCUMENTATION_INDEX_DIR,
+                            f"{source.name}-bm25-{key}")
+
+        if not rebuild and os.path.isfile(os.path.join(path, "manifest.json")):
+            logger.debug("Loading lexical index %s", path)
+            index = BM25Index.load(path)
+        else:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            logger.debug("Building lexical index %s", path)
+            index = BM25Index.build(
+                path, iter_chunks(iter_source(source)), key)
+
+        _indexes[source.name] = index
+        return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Query the offline lexical documentation index.")
+    parser.add_argument("query")
+    parser.add_argument("--source", default=ANGULAR_DOCUMENTATION.name,
+                        choices=list(SOURCES))
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--rebuild", action="store_true")
+    args = parser.parse_args()
+
+    index = get_bm25_index(SOURCES[args.source], rebuild=args.rebuild)
+    for doc_id, score in index.search_ids(args.query, args.k):
+        doc = index.documents[doc_id]
+        print(f"{score:.3f} [{doc.metadata.get('start_index')}] "
+              f"{doc.page_content[:120]!r}")
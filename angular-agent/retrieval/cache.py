@@ -0,0 +1,58 @@
+import re
+import threading
+from collections import OrderedDict
+from langchain_core.documents import Document
+from utils.constants import DOCUMENTATION_QUERY_CACHE_SIZE
+
+# Bounded LRU cache of search results shared by both search_documentation tools.
+# Keys include the version (content address) of the indexes that produced the
+# results, so a rebuilt index never serves stale results.
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    return WHITESPACE.sub(" ", query.lower()).strip(" \t\n?.!")
+
+
+class QueryCache:
+    """Thread safe LRU cache of search results."""
+
+    def __init__(self, max_size: int = DOCUMENTATION_QUERY_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries: OrderedDict[tuple, list[Document]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> list[Document] | None:
+        with self._lock:
+            documents = self.entries.get(key)
+            if documents is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return list(documents)
+
+    def put(self, key: tuple, documents: list[Document]):
+        with self._lock:
+            self.entries[key] = list(documents)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, source_name: str | None = None):
+        """
+        Function that drops the cached results of a source (or of every source).
+
+        Args:
+            source_name: str | None (name of the rebuilt source, None for all).
+        """
+        with self._lock:
+            for key in [key for key in self.entries
+                        if source_name is None or key[0] == source_name]:
+                del self.entries[key]
+
+
+query_cache = QueryCache()
@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import math
+import random
+import re
+import threading
+import time
+from langchain_core.embeddings import Embeddings
+from utils.constants import EMBEDDING_MODEL, EMBEDDING_BATCH_SIZE, EMBEDDING_CONCURRENCY, \
+    EMBEDDING_REQUESTS_PER_MINUTE, EMBEDDING_MAX_RETRIES
+from utils.metrics import metrics
+from utils.logger import logger
+
+# Embedding pipeline shared by the documentation indexes and embed_documentation.py:
+# texts are embedded in batches, with a bounded number of concurrent requests, a
+# token bucket keeping requests under the quota and exponential backoff when the
+# API reports that the quota was exceeded anyway.
+
+LOCAL_EMBEDDING_MODEL = "local"
+LOCAL_EMBEDDING_DIMENSIONS = 768
+
+QUOTA_ERRORS = ("429", "quota", "resource_exhausted", "resource exhausted", "rate limit")
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic local embedder hashing word tokens into a fixed number of signed
+    buckets. Similar texts get similar vectors, so the whole pipeline can run offline.
+    """
+
+    def __init__(self, size: int = LOCAL_EMBEDDING_DIMENSIONS):
+        self.size = size
+
+    def _embed(self, text: str) -> list[float]:
+        vector = [0.0] * self.size
+        for token in re.findall(r"[a-z0-9]+", text.lower()):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.size
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
+
+
+def get_embeddings(model: str = EMBEDDING_MODEL) -> Embeddings:
+    """
+    Function that returns the embedder for a model name, `local` being the
+    offline `HashEmbeddings`.
+
+    Args:
+        model: str (embedding model name).
+    """
+    if model == LOCAL_EMBEDDING_MODEL:
+        return HashEmbeddings()
+
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+    return GoogleGenerativeAIEmbeddings(model=model)
+
+
+class TokenBucket:
+    """
+    Token bucket allowing `rate` acquisitions per second with bursts of `capacity`.
+    Each acquisition reserves its token under a thread lock and sleeps until it is due,
+    so one bucket can be shared by the event loops of successive `embed` calls.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens +
+                              (now - self.updated) * self.rate)
+            self.updated = now
+            # A negative balance is the wait of the acquisitions already reserved.
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if delay:
+            await asyncio.sleep(delay)
+
+
+def is_quota_error(error: Exception) -> bool:
+    message = f"{type(error).__name__} {error}".lower()
+    return any(marker in message for marker in QUOTA_ERRORS)
+
+
+class EmbeddingPipeline:
+    """Batched, concurrent and rate limited wrapper around an embedder."""
+
+    def __init__(self, embedder: Embeddings,
+                 batch_size: int = EMBEDDING_BATCH_SIZE,
+                 concurrency: int = EMBEDDING_CONCURRENCY,
+                 requests_per_minute: float = EMBEDDING_REQUESTS_PER_MINUTE,
+                 max_retries: int = EMBEDDING_MAX_RETRIES,
+                 backoff: float = 2.0):
+        self.embedder = embedder
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.requests_per_minute = requests_per_minute
+        self.max_retries = max_retries
+        self.backoff = backoff
+        # Shared by every call, so the quota holds across batches. The local embedder
+        # has no quota to respect.
+        self.bucket = TokenBucket(requests_per_minute / 60, concurrency) \
+            if requests_per_minute and not isinstance(embedder, HashEmbeddings) else None
+        self.stats = {"chunks": 0, "batches": 0, "retries": 0,
+                      "seconds": 0.0, "chunks_per_second": 0.0}
+
+    async def _embed_batch(self, batch: list[str],
+                           semaphore: asyncio.Semaphore) -> list[list[float]]:
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                if self.bucket is not None:
+                    await self.bucket.acquire()
+                try:
+                    with metrics.timer("embedding_batch_seconds"):
+                        return await self.embedder.aembed_documents(batch)
+                except Exception as e:
+                    if attempt == self.max_retries or not is_quota_error(e):
+                        raise
+                    self.stats["retries"] += 1
+                    metrics.increment("embedding_retries")
+                    delay = self.backoff * 2 ** attempt * \
+                        (1 + random.random())
+                    logger.debug(
+                        "Embedding quota exceeded, retrying in %.1fs", delay)
+                    await asyncio.sleep(delay)
+
+    async def aembed(self, texts: list[str]) -> list[list[float]]:
+        """
+        Function that embeds texts, keeping their order.
+
+        Args:
+            texts: list[str] (texts to embed).
+        """
+        start = time.perf_counter()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        batches = [texts[i:i + self.batch_size]
+                   for i in range(0, len(texts), self.batch_size)]
+        results = await asyncio.gather(*(self._embed_batch(batch, semaphore)
+                                         for batch in batches))
+
+        elapsed = time.perf_counter() - start
+        self.stats["chunks"] += len(texts)
+        self.stats["batches"] += len(batches)
+        self.stats["seconds"] += elapsed
+        self.stats["chunks_per_second"] = self.stats["chunks"] / \
+            self.stats["seconds"] if self.stats["seconds"] else 0.0
+        logger.info(f"Embedded {len(texts)} chunks in {len(batches)} batches, "
+                    f"{len(texts) / elapsed if elapsed else 0.0:.1f} chunks/s")
+
+        return [vector for batch in results for vector in batch]
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        return asyncio.run(self.aembed(texts))
@@ -0,0 +1,173 @@
+from langchain_core.documents import Document
+from retrieval.bm25 import get_bm25_index, tokenize
+from retrieval.index import get_index
+from retrieval.sources import DocumentationSource
+from utils.constants import DOCUMENTATION_CANDIDATES, DOCUMENTATION_TOKEN_BUDGET
+from utils.tokens import count_tokens, truncate_to_tokens
+from utils.metrics import metrics
+from utils.logger import logger
+
+# Hybrid retrieval: lexical and dense candidates are fused with reciprocal-rank
+# fusion, reranked locally by query term coverage, merged where the splitter
+# overlap makes neighbouring chunks repeat text, and trimmed to a token budget.
+
+RRF_K = 60
+
+# Sources whose dense index could not be built in this process (no API key, quota).
+_dense_unavailable: set[str] = set()
+
+
+def chunk_id(doc: Document) -> tuple[str, int]:
+    return (str(doc.metadata.get("source", "")), int(doc.metadata.get("start_index", -1)))
+
+
+def reciprocal_rank_fusion(rankings: list[list[Document]], k: int = RRF_K) -> list[tuple[Document, float]]:
+    """
+    Function that fuses several rankings of the same chunks.
+
+    Args:
+        rankings: list[list[Document]] (rankings, best first).
+        k: int (RRF smoothing constant).
+    """
+    scores: dict[tuple[str, int], float] = {}
+    documents: dict[tuple[str, int], Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = chunk_id(doc)
+            documents.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1 / (k + rank + 1)
+    return sorted(((documents[key], score) for key, score in scores.items()),
+                  key=lambda item: item[1], reverse=True)
+
+
+def rerank(query: str, candidates: list[tuple[Document, float]]) -> list[Document]:
+    """
+    Function that reorders fused candidates favouring chunks that cover more of the
+    distinct query terms.
+
+    Args:
+        query: str (text searched for).
+        candidates: list[tuple[Document, float]] (fused candidates and scores).
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return [doc for doc, _ in candidates]
+
+    def score(item: tuple[Document, float]) -> float:
+        doc, fused = item
+        coverage = len(terms.intersection(tokenize(doc.page_content))) / len(terms)
+        return fused * (1 + coverage)
+
+    return [doc for doc, _ in sorted(candidates, key=score, reverse=True)]
+
+
+def merge_overlapping(documents: list[Document]) -> list[Document]:
+    """
+    Function that merges chunks whose character ranges overlap in the same source,
+    keeping the rank of the best one. Adjacent chunks and chunks without a
+    `start_index` are kept apart.
+
+    Args:
+        documents: list[Document] (chunks, best first).
+    """
+    merged: list[Document] = []
+    for doc in documents:
+        source, start = chunk_id(doc)
+        end = start + len(doc.page_content)
+        for i, kept in enumerate(merged):
+            kept_source, kept_start = chunk_id(kept)
+            kept_end = kept_start + len(kept.page_content)
+            if start < 0 or kept_start < 0 or kept_source != source \
+                    or start >= kept_end or end <= kept_start:
+                continue
+            if start <= kept_start and end >= kept_end:
+                content, new_start = doc.page_content, start
+            elif start >= kept_start and end <= kept_end:
+                content, new_start = kept.page_content, kept_start
+            elif start > kept_start:
+                content = kept.page_content + doc.page_content[kept_end - start:]
+                new_start = kept_start
+            else:
+                content = doc.page_content + kept.page_content[end - kept_start:]
+                new_start = start
+            merged[i] = Document(page_content=content,
+                                 metadata={**kept.metadata, "start_index": new_start})
+            break
+        else:
+            merged.append(doc)
+    return merged
+
+
+def trim_to_budget(documents: list[Document], budget: int) -> list[Document]:
+    """
+    Function that keeps the best chunks that fit in the token budget.
+    The first chunk is truncated instead of dropped if it alone exceeds the budget.
+
+    Args:
+        documents: list[Document] (chunks, best first).
+        budget: int (maximum number of tokens).
+    """
+    selected = []
+    used = 0
+    for doc in documents:
+        tokens = count_tokens(doc.page_content)
+        if used + tokens <= budget:
+            selected.append(doc)
+            used += tokens
+        elif not selected:
+            selected.append(Document(page_content=truncate_to_tokens(doc.page_content, budget),
+                                     metadata=doc.metadata))
+            break
+    return selected
+
+
+def dense_available(source: DocumentationSource) -> bool:
+    """
+    Function that loads (or builds) the dense index of a source, remembering for the
+    rest of the process when it cannot be built.
+
+    Args:
+        source: DocumentationSource (source to search).
+    """
+    if source.name in _dense_unavailable:
+        return False
+    try:
+        get_index(source)
+        return True
+    except Exception as e:
+        logger.error(
+            f"Dense retrieval unavailable for {source.name}, using lexical only")
+        logger.error(e)
+        _dense_unavailable.add(source.name)
+        return False
+
+
+def dense_candidates(source: DocumentationSource, query: str, k: int) -> list[Document]:
+    if not dense_available(source):
+        return []
+    try:
+        return get_index(source).similarity_search(query, k)
+    except Exception as e:
+        logger.error(f"Dense retrieval failed for {source.name}")
+        logger.error(e)
+        return []
+
+
+def hybrid_search(source: DocumentationSource, query: str,
+                  candidates: int = DOCUMENTATION_CANDIDATES,
+                  budget: int = DOCUMENTATION_TOKEN_BUDGET) -> list[Document]:
+    """
+    Function that runs the hybrid retrieval pipeline.
+
+    Args:
+        source: DocumentationSource (source to search).
+        query: str (text to search for).
+        candidates: int (candidates taken from each retriever).
+        budget: int (maximum number of tokens returned).
+    """
+    lexical = get_bm25_index(source).similarity_search(query, candidates)
+    dense = dense_candidates(source, query, candidates)
+    with metrics.timer("retrieval_seconds", stage="rank", index="hybrid"):
+        fused = reciprocal_rank_fusion(
+            [ranking for ranking in (lexical, dense) if ranking])
+        return trim_to_budget(merge_overlapping(rerank(query, fused)), budget)
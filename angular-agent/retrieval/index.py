@@ -0,0 +1,235 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections.abc import Iterable, Sequence
+import numpy as np
+from langchain_core.documents import Document
+from retrieval.cache import query_cache
+from retrieval.embedding import EmbeddingPipeline, get_embeddings
+from retrieval.sources import DocumentationSource
+from retrieval.streaming import WINDOW_SIZE, iter_source, iter_chunks, batched, \
+    JsonlDocumentWriter, JsonlDocuments
+from retrieval.vector_store import NumpyVectorStore
+from utils.constants import DOCUMENTATION_INDEX_DIR, DOCUMENTATION_CHUNKER, EMBEDDING_MODEL, \
+    CHUNK_SIZE, CHUNK_OVERLAP, EMBEDDING_BATCH_SIZE, EMBEDDING_CONCURRENCY
+from utils.metrics import metrics
+from utils.logger import logger
+
+# Persistent, content-addressed documentation index.
+#
+# An index lives in `DOCUMENTATION_INDEX_DIR/<source>-<key>/` where `key` hashes the
+# corpus content, the chunking parameters and the embedding model, so it is built
+# once and reused across calls, processes and runs:
+#   - manifest.json: build parameters and sizes.
+#   - documents.jsonl: one chunk per line (page_content + metadata).
+#   - documents.idx: uint64 byte offset of every line of documents.jsonl.
+#   - embeddings.npy: unit-length float32 matrix (chunks x dimensions), memory-mapped
+#     on load and searched by `NumpyVectorStore`.
+#
+# Rebuild after the documentation changes with:
+#   python -m retrieval.search --rebuild [source ...]
+
+_indexes: dict[str, "DocumentationIndex"] = {}
+_lock = threading.Lock()
+
+
+def index_key(documents: Iterable[Document],
+              chunk_size: int = CHUNK_SIZE,
+              chunk_overlap: int = CHUNK_OVERLAP,
+              model: str = EMBEDDING_MODEL) -> str:
+    """
+    Function that computes the content address of an index.
+
+    Args:
+        documents: Iterable[Document] (raw documents of the source, see `iter_source`).
+        chunk_size: int (splitter chunk size in characters).
+        chunk_overlap: int (splitter chunk overlap in characters).
+        model: str (embedding model name).
+    """
+    digest = hashlib.sha256()
+    for doc in documents:
+        digest.update(str(doc.metadata.get("source", "")).encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(doc.page_content.encode("utf-8"))
+        digest.update(b"\0")
+    digest.update(json.dumps({
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "window_size": WINDOW_SIZE,
+        "chunker": DOCUMENTATION_CHUNKER,
+        "model": model
+    }, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+
+class DocumentationIndex:
+    """Chunks of a documentation source together with their embeddings."""
+
+    def __init__(self, path: str, manifest: dict, vector_store: NumpyVectorStore):
+        self.path = path
+        self.manifest = manifest
+        self.vector_store = vector_store
+        self._embedder = None
+
+    @property
+    def documents(self) -> Sequence[Document]:
+        return self.vector_store.documents
+
+    @property
+    def key(self) -> str:
+        return self.manifest["key"]
+
+    @classmethod
+    def build(cls, source: DocumentationSource, embedder=None) -> "DocumentationIndex":
+        """
+        Function that streams a source through splitting and embedding into a new index.
+        Chunks are written batch by batch, so memory does not grow with the corpus.
+
+        Args:
+            source: DocumentationSource (source being indexed).
+            embedder: Embeddings (embedding model, defaults to `EMBEDDING_MODEL`).
+        """
+        key = index_key(iter_source(source))
+        path = os.path.join(DOCUMENTATION_INDEX_DIR, f"{source.name}-{key}")
+        embedder = embedder or get_embeddings()
+        pipeline = EmbeddingPipeline(embedder)
+
+        # First pass only counts chunks, so the matrix can be preallocated on disk.
+        count = sum(1 for _ in iter_chunks(iter_source(source)))
+        logger.debug("Embedding %s chunks for %s", count, source.name)
+
+        # Write into a private directory and rename it so concurrent builders
+        # never observe a partial index.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        os.makedirs(tmp_path, exist_ok=True)
+        matrix = None
+        row = 0
+        with JsonlDocumentWriter(tmp_path) as writer:
+            for batch in batched(iter_chunks(iter_source(source)),
+                                 EMBEDDING_BATCH_SIZE * EMBEDDING_CONCURRENCY):
+                vectors = pipeline.embed([chunk.page_content for chunk in batch])
+                if matrix is None:
+                    matrix = NumpyVectorStore.create(
+                        tmp_path, count, len(vectors[0]))
+                NumpyVectorStore.write(matrix, row, vectors)
+                row += len(batch)
+                for chunk in batch:
+                    writer.write(chunk)
+        if matrix is None:
+            matrix = NumpyVectorStore.create(tmp_path, 0, 0)
+        matrix.flush()
+
+        manifest = {
+            "key": key,
+            "source": source.name,
+            "paths": list(source.paths),
+            "chunk_size": CHUNK_SIZE,
+            "chunk_overlap": CHUNK_OVERLAP,
+            "chunker": DOCUMENTATION_CHUNKER,
+            "model": EMBEDDING_MODEL,
+            "documents": count,
+            "dimensions": int(matrix.shape[1]),
+            "normalized": True,
+            "chunks_per_second": round(pipeline.stats["chunks_per_second"], 2),
+        }
+        del matrix
+        with open(os.path.join(tmp_path, "manifest.json"), mode='w', encoding='utf-8') as file:
+            json.dump(manifest, file, indent=2)
+
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            # Another process published the same index first.
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        index = cls.load(path)
+        index._embedder = embedder
+        return index
+
+    @classmethod
+    def load(cls, path: str) -> "DocumentationIndex":
+        """
+        Function that opens a persisted index, memory-mapping its embeddings and
+        decoding chunks only when they are returned.
+
+        Args:
+            path: str (index directory).
+        """
+        with open(os.path.join(path, "manifest.json"), mode='r', encoding='utf-8') as file:
+            manifest = json.load(file)
+        documents = JsonlDocuments(path)
+        if manifest.get("normalized"):
+            vector_store = NumpyVectorStore.load(path, documents)
+        else:
+            vector_store = NumpyVectorStore.from_vectors(
+                np.load(os.path.join(path, NumpyVectorStore.FILE_NAME)), documents)
+        return cls(path, manifest, vector_store)
+
+    def similarity_search(self, query: str, k: int = 4) -> list[Document]:
+        """
+        Function that returns the `k` chunks most similar to the query.
+
+        Args:
+            query: str (text to search for).
+            k: int (number of chunks to return).
+        """
+        if len(self.documents) == 0:
+            return []
+        with metrics.timer("retrieval_seconds", stage="embed", index="dense"):
+            vector = self.embedder.embed_query(query)
+        with metrics.timer("retrieval_seconds", stage="search", index="dense"):
+            return self.vector_store.similarity_search_by_vector(vector, k)
+
+    def batch_similarity_search(self, queries: list[str], k: int = 4) -> list[list[Document]]:
+        """
+        Function that answers several queries with a single matrix product.
+
+        Args:
+            queries: list[str] (texts to search for).
+            k: int (number of chunks to return per query).
+        """
+        if len(self.documents) == 0 or len(queries) == 0:
+            return [[] for _ in queries]
+        with metrics.timer("retrieval_seconds", stage="embed", index="dense"):
+            vectors = [self.embedder.embed_query(query) for query in queries]
+        with metrics.timer("retrieval_seconds", stage="search", index="dense"):
+            return self.vector_store.similarity_search_by_vectors(vectors, k)
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = get_embeddings(self.manifest["model"])
+        return self._embedder
+
+
+def get_index(source: DocumentationSource, rebuild: bool = False) -> DocumentationIndex:
+    """
+    Function that returns the index of a source, building it only when no index
+    exists for the current corpus, chunking parameters and embedding model.
+
+    Args:
+        source: DocumentationSource (source to index).
+        rebuild: bool (refetch remote documents and rebuild the index).
+    """
+    with _lock:
+        if not rebuild and source.name in _indexes:
+            return _indexes[source.name]
+        if rebuild:
+            query_cache.invalidate(source.name)
+
+        key = index_key(iter_source(source, refresh=rebuild))
+        path = os.path.join(DOCUMENTATION_INDEX_DIR, f"{source.name}-{key}")
+
+        if not rebuild and os.path.isfile(os.path.join(path, "manifest.json")):
+            logger.debug("Loading documentation index %s", path)
+            index = DocumentationIndex.load(path)
+        else:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            logger.debug("Building documentation index %s", path)
+            index = DocumentationIndex.build(source)
+
+        _indexes[source.name] = index
+        return index
@@ -0,0 +1,114 @@
+import re
+from collections.abc import Iterable, Iterator
+from langchain_core.documents import Document
+from utils.constants import CHUNK_SIZE
+
+# Markdown aware chunking for the Angular LLM documentation. Chunks start at headings,
+# are only cut on blank lines outside code fences (so fenced code blocks are never
+# split, even when a single block is larger than the chunk size) and carry the path
+# of headings they belong to in the `headings` metadata.
+
+FENCE_PATTERN = re.compile(r"(`{3,}|~{3,})(.*)$")
+HEADING_PATTERN = re.compile(r"(#{1,6})\s+(.*?)\s*#*\s*$")
+HEADING_SEPARATOR = " > "
+
+
+def update_fence(line: str, fence: str | None) -> str | None:
+    """
+    Function that returns the open code fence marker after reading a line, following
+    the CommonMark rule that a closing fence uses the same character, is at least as
+    long as the opening one and has no info string.
+
+    Args:
+        line: str (line being read).
+        fence: str | None (marker of the open fence, None outside fences).
+    """
+    match = FENCE_PATTERN.match(line.lstrip())
+    if match is None:
+        return fence
+    marker, info = match.groups()
+    if fence is None:
+        return marker
+    if marker[0] == fence[0] and len(marker) >= len(fence) and not info.strip():
+        return None
+    return fence
+
+
+class MarkdownChunker:
+    """Splits markdown documents in a single linear pass over their lines."""
+
+    def __init__(self, chunk_size: int = CHUNK_SIZE, min_size: int | None = None):
+        self.chunk_size = chunk_size
+        # Sections shorter than this are merged with the following ones.
+        self.min_size = chunk_size // 4 if min_size is None else min_size
+
+    def split(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """
+        Function that yields the chunks of consecutive documents (or windows of the
+        same file), keeping the heading path across them.
+
+        Args:
+            documents: Iterable[Document] (documents to split, in file order).
+        """
+        headings: list[tuple[int, str]] = []
+        source = None
+        for doc in documents:
+            if doc.metadata.get("source") != source:
+                source = doc.metadata.get("source")
+                headings = []
+            yield from self._split_document(doc, headings)
+
+    def _split_document(self, doc: Document, headings: list[tuple[int, str]]) -> Iterator[Document]:
+        metadata = {key: value for key, value in doc.metadata.items()
+                    if key != "offset"}
+        start = doc.metadata.get("offset", 0)
+        lines: list[str] = []
+        size = 0
+        path = ""
+        # Lines, characters and heading path of the buffer up to its last safe split point.
+        safe_lines = 0
+        safe_size = 0
+        safe_path = ""
+        fence = None
+
+        def emit(count: int) -> Iterator[Document]:
+            content = "".join(lines[:count])
+            if content.strip():
+                yield Document(page_content=content, metadata={
+                    **metadata, "start_index": start, "headings": path})
+
+        for line in doc.page_content.splitlines(keepends=True):
+            heading = HEADING_PATTERN.match(line) if fence is None else None
+            if heading is not None:
+                level = len(heading.group(1))
+                while headings and headings[-1][0] >= level:
+                    headings.pop()
+                headings.append((level, heading.group(2)))
+                if size >= self.min_size:
+                    yield from emit(len(lines))
+                    start += size
+                    lines, size, safe_lines, safe_size = [], 0, 0, 0
+                elif lines:
+                    safe_lines, safe_size = len(lines), size
+                    safe_path = HEADING_SEPARATOR.join(
+                        title for _, title in headings)
+
+            if not lines:
+                path = HEADING_SEPARATOR.join(title for _, title in headings)
+            lines.append(line)
+            size += len(line)
+            fence = update_fence(line, fence)
+            if fence is None and not line.strip():
+                safe_lines, safe_size = len(lines), size
+                safe_path = HEADING_SEPARATOR.join(
+                    title for _, title in headings)
+
+            if size > self.chunk_size and safe_lines > 0:
+                yield from emit(safe_lines)
+                start += safe_size
+                lines = lines[safe_lines:]
+                size -= safe_size
+                path = safe_path
+                safe_lines, safe_size = 0, 0
+
+        yield from emit(len(lines))
@@ -0,0 +1,84 @@
+import argparse
+from langchain_core.documents import Document
+from retrieval.bm25 import get_bm25_index
+from retrieval.cache import query_cache, normalize_query
+from retrieval.hybrid import hybrid_search, dense_available
+from retrieval.index import get_index
+from retrieval.sources import DocumentationSource, SOURCES
+from utils.constants import DOCUMENTATION_RETRIEVAL_MODE
+from utils.metrics import metrics
+
+
+def index_version(source: DocumentationSource, mode: str) -> tuple[str, ...]:
+    """
+    Function that returns the keys of the indexes a search mode reads.
+
+    Args:
+        source: DocumentationSource (source to search).
+        mode: str (retrieval mode).
+    """
+    version = []
+    if mode in ("hybrid", "lexical"):
+        version.append(get_bm25_index(source).key)
+    if mode == "dense" or (mode == "hybrid" and dense_available(source)):
+        version.append(get_index(source).key)
+    return tuple(version)
+
+
+def search(source: DocumentationSource, query: str, k: int = 4,
+           mode: str = DOCUMENTATION_RETRIEVAL_MODE) -> list[Document]:
+    """
+    Function that searches the documentation of a source, answering repeated
+    queries from the query cache.
+
+    Args:
+        source: DocumentationSource (source to search).
+        query: str (text to search for).
+        k: int (number of chunks to return).
+        mode: str ("hybrid" to fuse and rerank both indexes, "lexical" for the
+            offline BM25 index, "dense" for embeddings).
+    """
+    with metrics.timer("retrieval_seconds", stage="load", index=mode):
+        version = index_version(source, mode)
+    key = (source.name, mode, k, version, normalize_query(query))
+    documents = query_cache.get(key)
+    metrics.increment("retrieval_cache_lookups",
+                      result="miss" if documents is None else "hit")
+    if documents is not None:
+        return documents
+
+    if mode == "hybrid":
+        documents = hybrid_search(source, query)[:k]
+    elif mode == "lexical":
+        documents = get_bm25_index(source).similarity_search(query, k)
+    elif mode == "dense":
+        documents = get_index(source).similarity_search(query, k)
+    else:
+        raise ValueError(f"Unknown retrieval mode {mode}")
+
+    query_cache.put(key, documents)
+    return documents
+
+
+def format_documents(documents: list[Document]) -> str:
+    return "\n\n".join(doc.page_content for doc in documents)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the persistent documentation indexes.")
+    parser.add_argument("sources", nargs="*", default=list(SOURCES),
+                        help="sources to index (default: all)")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="refetch remote sources and rebuild even if an index exists")
+    parser.add_argument("--lexical-only", action="store_true",
+                        help="only build the offline BM25 index")
+    args = parser.parse_args()
+
+    for name in args.sources:
+        lexical = get_bm25_index(SOURCES[name], rebuild=args.rebuild)
+        print(f"{name}: {lexical.manifest['documents']} chunks, "
+              f"{lexical.manifest['terms']} terms (lexical)")
+        if not args.lexical_only:
+            dense = get_index(SOURCES[name], rebuild=args.rebuild)
+            print(f"{name}: {dense.manifest['documents']} chunks in {dense.path}")
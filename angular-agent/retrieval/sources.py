@@ -0,0 +1,43 @@
+import os
+from dataclasses import dataclass
+
+DOCUMENTATION_DIR = os.path.join(os.path.dirname(
+    os.path.dirname(os.path.abspath(__file__))), "documentation")
+
+
+@dataclass(frozen=True)
+class DocumentationSource:
+    """
+    A named group of documentation locations indexed together.
+
+    Attributes:
+        name: str (name used for the index directory and the rebuild command).
+        paths: tuple[str, ...] (local files or http(s) URLs).
+    """
+    name: str
+    paths: tuple[str, ...]
+
+    @property
+    def is_local(self) -> bool:
+        return not any(path.startswith(("http://", "https://"))
+                       for path in self.paths)
+
+
+# https://angular.dev/llms.txt
+# https://angular.dev/context/llm-files/llms-full.txt (bundled, includes the style guide)
+ANGULAR_DOCUMENTATION = DocumentationSource(
+    name="angular",
+    paths=(os.path.join(DOCUMENTATION_DIR, "angular-llm.txt"),)
+)
+
+PROJECT_DOCUMENTATION = DocumentationSource(
+    name="project",
+    paths=(
+        "https://angular.dev/reference/configs/file-structure",
+        "https://angular.dev/reference/configs/workspace-config",
+        "https://angular.dev/reference/versions",
+    )
+)
+
+SOURCES = {source.name: source for source in (
+    ANGULAR_DOCUMENTATION, PROJECT_DOCUMENTATION)}
@@ -0,0 +1,173 @@
+import json
+import mmap
+import os
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+from itertools import islice
+from langchain_core.documents import Document
+from langchain_text_splitters.character import RecursiveCharacterTextSplitter
+from retrieval.markdown import MarkdownChunker, update_fence
+from retrieval.sources import DocumentationSource
+from utils.constants import DOCUMENTATION_INDEX_DIR, DOCUMENTATION_CHUNKER, CHUNK_SIZE, CHUNK_OVERLAP
+from utils.logger import logger
+
+# Generator based loading and chunking. Local files are read line by line into
+# windows of about `WINDOW_SIZE` characters that end before a markdown heading
+# outside a code fence, each window is split on its own and chunks are consumed in
+# batches, so neither the corpus nor all of its chunks are ever held at once.
+
+WINDOW_SIZE = 16 * CHUNK_SIZE
+
+
+def iter_source(source: DocumentationSource, refresh: bool = False) -> Iterator[Document]:
+    """
+    Function that yields the documents of a source as bounded windows.
+    Remote sources are fetched once and cached in the index directory until `refresh` is set.
+
+    Args:
+        source: DocumentationSource (source to load).
+        refresh: bool (fetch remote documents again even if cached).
+    """
+    if source.is_local:
+        for path in source.paths:
+            yield from _iter_file_windows(path)
+        return
+
+    cache_path = os.path.join(DOCUMENTATION_INDEX_DIR,
+                              "sources", f"{source.name}.jsonl")
+    if not refresh and os.path.isfile(cache_path):
+        with open(cache_path, mode='r', encoding='utf-8') as file:
+            for line in file:
+                yield Document(**json.loads(line))
+        return
+
+    import bs4
+    from langchain_community.document_loaders import WebBaseLoader
+
+    logger.debug("Fetching documentation source %s", source.name)
+    loader = WebBaseLoader(web_paths=list(source.paths), verify_ssl=True, bs_kwargs={
+        "parse_only": bs4.SoupStrainer("docs-viewer")
+    })
+
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, mode='w', encoding='utf-8') as file:
+            for doc in loader.lazy_load():
+                file.write(json.dumps({"page_content": doc.page_content,
+                                       "metadata": doc.metadata}) + "\n")
+                yield doc
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        # Failed fetches (and consumers stopping early) leave no partial cache behind.
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def _iter_file_windows(path: str) -> Iterator[Document]:
+    lines: list[str] = []
+    size = 0
+    offset = 0
+    fence = None
+    with open(path, mode='r', encoding='utf-8') as file:
+        for line in file:
+            if size >= WINDOW_SIZE and fence is None and line.startswith("#"):
+                yield Document(page_content="".join(lines),
+                               metadata={"source": path, "offset": offset})
+                offset += size
+                lines, size = [], 0
+            lines.append(line)
+            size += len(line)
+            fence = update_fence(line, fence)
+    if lines:
+        yield Document(page_content="".join(lines),
+                       metadata={"source": path, "offset": offset})
+
+
+def iter_chunks(documents: Iterable[Document],
+                chunk_size: int = CHUNK_SIZE,
+                chunk_overlap: int = CHUNK_OVERLAP,
+                chunker: str = DOCUMENTATION_CHUNKER) -> Iterator[Document]:
+    """
+    Function that splits documents one at a time, keeping `start_index` relative to
+    the original file.
+
+    Args:
+        documents: Iterable[Document] (documents or windows to split).
+        chunk_size: int (chunk size in characters).
+        chunk_overlap: int (chunk overlap in characters, recursive chunker only).
+        chunker: str ("markdown" or "recursive").
+    """
+    if chunker == "markdown":
+        yield from MarkdownChunker(chunk_size).split(documents)
+        return
+
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        add_start_index=True,
+    )
+    for doc in documents:
+        offset = doc.metadata.get("offset", 0)
+        for chunk in text_splitter.split_documents([doc]):
+            chunk.metadata.pop("offset", None)
+            chunk.metadata["start_index"] += offset
+            yield chunk
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+class JsonlDocumentWriter:
+    """Appends documents to `documents.jsonl`, recording the byte offset of each line."""
+
+    def __init__(self, path: str):
+        self.file = open(os.path.join(path, "documents.jsonl"), mode='wb')
+        self.index_path = os.path.join(path, "documents.idx")
+        self.offsets = array("Q")
+
+    def write(self, doc: Document):
+        self.offsets.append(self.file.tell())
+        self.file.write((json.dumps({"page_content": doc.page_content,
+                                     "metadata": doc.metadata}) + "\n").encode("utf-8"))
+
+    def close(self):
+        self.file.close()
+        with open(self.index_path, mode='wb') as file:
+            self.offsets.tofile(file)
+
+    def __enter__(self) -> "JsonlDocumentWriter":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class JsonlDocuments(Sequence):
+    """Read-only sequence of the documents in `documents.jsonl`, decoded on access."""
+
+    def __init__(self, path: str):
+        self.offsets = array("Q")
+        with open(os.path.join(path, "documents.idx"), mode='rb') as file:
+            self.offsets.frombytes(file.read())
+        with open(os.path.join(path, "documents.jsonl"), mode='rb') as file:
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) \
+                if self.offsets else b""
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        start = self.offsets[i]
+        end = self.offsets[i + 1] if i + 1 < len(self) else len(self.data)
+        return Document(**json.loads(self.data[start:end]))
@@ -0,0 +1,111 @@
+import os
+from collections.abc import Sequence
+import numpy as np
+from langchain_core.documents import Document
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """
+    Function that scales vectors to unit length (zero vectors are left untouched).
+
+    Args:
+        vectors: np.ndarray (one vector per row, or a single vector).
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+class NumpyVectorStore:
+    """
+    Vector store keeping every embedding in one contiguous, pre-normalized float32
+    matrix so a query batch is answered with a single matrix product.
+    """
+
+    FILE_NAME = "embeddings.npy"
+
+    def __init__(self, matrix: np.ndarray, documents: Sequence[Document]):
+        if len(matrix) != len(documents):
+            raise ValueError(
+                f"{len(matrix)} embeddings for {len(documents)} documents")
+        self.matrix = matrix
+        self.documents = documents
+
+    @classmethod
+    def from_vectors(cls, vectors, documents: Sequence[Document]) -> "NumpyVectorStore":
+        """
+        Function that creates a store from raw (not normalized) embeddings.
+
+        Args:
+            vectors: array-like (one embedding per document).
+            documents: Sequence[Document] (documents in the same order).
+        """
+        matrix = np.ascontiguousarray(normalize(vectors), dtype=np.float32)
+        return cls(matrix.reshape(len(documents), -1), documents)
+
+    @classmethod
+    def create(cls, path: str, rows: int, dimensions: int) -> np.ndarray:
+        """
+        Function that preallocates an on-disk matrix to be filled batch by batch
+        with `write`.
+
+        Args:
+            path: str (directory of the matrix).
+            rows: int (number of documents).
+            dimensions: int (embedding dimensions).
+        """
+        return np.lib.format.open_memmap(os.path.join(path, cls.FILE_NAME), mode='w+',
+                                         dtype=np.float32, shape=(rows, dimensions))
+
+    @staticmethod
+    def write(matrix: np.ndarray, row: int, vectors):
+        vectors = normalize(vectors)
+        matrix[row:row + len(vectors)] = vectors
+
+    def save(self, path: str):
+        np.save(os.path.join(path, self.FILE_NAME), self.matrix)
+
+    @classmethod
+    def load(cls, path: str, documents: Sequence[Document], mmap: bool = True) -> "NumpyVectorStore":
+        """
+        Function that opens a saved matrix, memory-mapped by default.
+
+        Args:
+            path: str (directory containing the matrix).
+            documents: Sequence[Document] (documents in the same order).
+            mmap: bool (map the file instead of reading it into memory).
+        """
+        matrix = np.load(os.path.join(path, cls.FILE_NAME),
+                         mmap_mode='r' if mmap else None)
+        return cls(matrix, documents)
+
+    def search(self, queries, k: int = 4) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Function that returns the indices and cosine scores of the `k` best rows for
+        every query, best first.
+
+        Args:
+            queries: array-like (one query embedding, or one per row).
+            k: int (number of results per query).
+        """
+        queries = normalize(np.atleast_2d(queries))
+        k = min(k, len(self.documents))
+        if k == 0:
+            empty = np.empty((len(queries), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        scores = queries @ self.matrix.T
+        if k < scores.shape[1]:
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        return np.take_along_axis(top, order, axis=1), np.take_along_axis(top_scores, order, axis=1)
+
+    def similarity_search_by_vectors(self, queries, k: int = 4) -> list[list[Document]]:
+        indices, _ = self.search(queries, k)
+        return [[self.documents[i] for i in row] for row in indices]
+
+    def similarity_search_by_vector(self, query, k: int = 4) -> list[Document]:
+        return self.similarity_search_by_vectors(query, k)[0]
@@ -6,3 +6,13 @@ class FileGenerated(BaseModel):
     """Schema for code generation."""
     path: str = Field("The path where the file was generated")
     content: str = Field("The code generated")
+
+
+class FileWriteStatus(BaseModel):
+    """Result of writing one file."""
+    path: str = Field(description="The path of the file")
+    status: str = Field(
+        description="created, updated, unchanged (same content already on disk) or failed")
+    sha256: str | None = Field(None, description="Hash of the content written")
+    seconds: float = Field(0.0, description="Time spent on the file")
+    error: str | None = Field(None, description="Error when the write failed")
@@ -0,0 +1,21 @@
+from pydantic import BaseModel, Field
+
+
+class ValidationIssue(BaseModel):
+    """Problem found in the generated project."""
+    path: str = Field(description="The file the problem is in")
+    kind: str = Field(
+        description="json, config, import (unresolved relative import), element (unknown "
+                    "component element) or selector (selector declared twice)")
+    severity: str = Field(description="error or warning")
+    message: str = Field(description="What is wrong")
+
+
+class ValidationReport(BaseModel):
+    """Result of validating the generated project."""
+    valid: bool = Field(description="True when there is no error")
+    files: int = Field(description="Files checked")
+    errors: int = Field(0, description="Issues with severity error")
+    warnings: int = Field(0, description="Issues with severity warning")
+    seconds: float = Field(0.0, description="Time spent on the validation")
+    issues: list[ValidationIssue] = Field(default_factory=list)
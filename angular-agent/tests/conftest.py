@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules of angular-agent are imported from its directory, as agent.py does.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,39 @@
+import os
+from retrieval.bm25 import BM25Index
+from retrieval.sources import ANGULAR_DOCUMENTATION
+from retrieval.streaming import iter_source, iter_chunks
+
+# The lexical index works fully offline on the bundled documentation/angular-llm.txt.
+
+
+def build(path: str) -> BM25Index:
+    return BM25Index.build(path, iter_chunks(iter_source(ANGULAR_DOCUMENTATION), chunker="markdown"),
+                           key="test")
+
+
+def test_build_and_load(tmp_path):
+    path = os.path.join(tmp_path, "angular-bm25")
+    built = build(path)
+    loaded = BM25Index.load(path)
+
+    assert loaded.key == "test"
+    assert loaded.manifest == built.manifest
+    assert len(loaded.documents) == built.manifest["documents"] > 0
+    assert loaded.search_ids("signal inputs", 5) == built.search_ids("signal inputs", 5)
+
+
+def test_known_query_ranks_its_section_first(tmp_path):
+    path = os.path.join(tmp_path, "angular-bm25")
+    build(path)
+    index = BM25Index.load(path)
+
+    best = index.similarity_search("deferrable views @defer", k=3)[0]
+
+    assert best.metadata["headings"].startswith("Deferred loading with `@defer`")
+    assert "@defer" in best.page_content
+
+
+def test_unknown_terms_match_nothing(tmp_path):
+    index = build(os.path.join(tmp_path, "angular-bm25"))
+
+    assert index.similarity_search("qwertyuiop zxcvbnm") == []
@@ -1,77 +1,61 @@
 import os
-import bs4
-from langchain_core.vectorstores import InMemoryVectorStore
-from langchain_community.document_loaders import WebBaseLoader
+import asyncio
 from langchain_core.tools import tool
-from langchain.tools.retriever import create_retriever_tool
-from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from retrieval.search import search, format_documents
+from retrieval.sources import PROJECT_DOCUMENTATION
 from schemas.file import FileGenerated
-from dotenv import load_dotenv
+from utils.file_writer import write_files
+from utils.workspace import current_workspace
 from utils.logger import logger
 
-load_dotenv()
+# The tools work on the project of the current session (utils/workspace.py): its files
+# are recorded in, and answered from, that session's manifest.
 
-PROJECT_OUTPUT = "/home/eric/langchain-test/project_output"
-DOCUMENTATION_URL = [
-    "https://angular.dev/reference/configs/file-structure",
-    "https://angular.dev/reference/configs/workspace-config",
-    "https://angular.dev/reference/versions"
-]
 
-
-async def search_documentation():
+@tool(parse_docstring=True)
+async def search_documentation(query: str) -> str:
     """
     Searches the official Angular documentation for comprehensive information about
     standard project structure, configuration files (e.g., angular.json, package.json),
     and file/directory naming conventions (e.g., kebab-case, module organization).
     **Call this tool once to establish a foundational understanding of Angular project setup.**
     Use the retrieved information to guide all subsequent file and directory creation.
+
+    Args:
+        query: str (what to look up in the documentation).
     """
     logger.debug("search_documentation init")
 
-    retriever = None
+    result = ""
     try:
-        loader = WebBaseLoader(web_paths=DOCUMENTATION_URL, verify_ssl=True, bs_kwargs={
-            "parse_only": bs4.SoupStrainer("docs-viewer")
-        })
-
-        documentation = []
-        async for doc in loader.alazy_load():
-            documentation.append(doc)
-
-        assert len(documentation) == 1
-
-        embeddings = GoogleGenerativeAIEmbeddings(model="models/embedding-001")
-        vector_store = InMemoryVectorStore.from_documents(
-            documentation, embeddings)
-
-        retriever = create_retriever_tool(
-            vector_store.as_retriever(),
-            name="search_documentation",
-            description=(
-                """
-                Searches the official Angular documentation for comprehensive information about
-                standard project structure, configuration files (e.g., angular.json, package.json),
-                and file/directory naming conventions (e.g., kebab-case, module organization).
-                **Call this tool once to establish a foundational understanding of Angular project setup.**
-                Use the retrieved information to guide all subsequent file and directory creation.
-                """.strip()
-            )
-        )
+        documents = await asyncio.to_thread(search, PROJECT_DOCUMENTATION, query)
+        result = format_documents(documents)
     except Exception as e:
         logger.error("Error when searching documentation")
         logger.error(e)
     finally:
         logger.debug("search_documentation end")
 
-    return retriever
+    return result
+
+
+def _write_and_record(files: list[tuple[str, str]]) -> list[dict]:
+    statuses = write_files(files)
+    logger.debug(statuses)
+    manifest = current_workspace().manifest
+    for status, (_, content) in zip(statuses, files):
+        # A failed write left the previous file, if any, in place.
+        if status.status != "failed":
+            manifest.record(status.path, content)
+    return [status.model_dump(exclude_none=True) for status in statuses]
 
 
 @tool(parse_docstring=True)
-def create_files(files: dict[str, str]) -> list[str]:
+async def create_files(files: dict[str, str]) -> list[dict]:
     """
     Function that creates multiple files in the predefined folder.
-    Returns a list of files that could not be created.
+    Returns the result of each file: `path`, `status` (created, updated, unchanged or
+    failed, with its `error`), `sha256` of the content and `seconds` spent on it.
 
     Args:
         files: dict[str, str] (dictionary with file names as keys and file content as values).
@@ -80,22 +64,31 @@ def create_files(files: dict[str, str]) -> list[str]:
     logger.debug("Files to create")
     logger.debug(files)
 
-    not_created = []
-    for file_name, file_content in files.items():
-        if not _create_file(file_name, file_content):
-            not_created.append(file_name)
+    statuses = await asyncio.to_thread(_write_and_record, list(files.items()))
 
-    logger.debug("Files not created")
-    logger.debug(not_created)
     logger.debug("create_files end")
 
-    return not_created
+    return statuses
+
+
+def _project_root(paths: list[str]) -> str:
+    # The generated files may live outside the manifest root (e.g. in the benchmarks).
+    root = current_workspace().root
+    paths = [os.path.abspath(path) for path in paths]
+    if not paths or all(path.startswith(root + os.sep) for path in paths):
+        return root
+    return os.path.commonpath([os.path.dirname(path) for path in paths])
 
 
 @tool(parse_docstring=True)
-def create_files_with_schema(files: list[FileGenerated]) -> list[str]:
+async def create_files_with_schema(files: list[FileGenerated]) -> dict:
     """
-    Function that creates files in the predefined folder using the FileGenerated schema.
+    Function that creates files in the predefined folder using the FileGenerated schema,
+    then validates the project.
+    Returns the result of each file (`files`: `path`, `status` created, updated, unchanged
+    or failed with its `error`, `sha256` and `seconds`) and the validation report
+    (`validation`): broken JSON configs, unresolved relative imports and unknown component
+    elements.
 
     Args:
         files: list[FileGenerated] (List of files to be created).
@@ -104,20 +97,35 @@ def create_files_with_schema(files: list[FileGenerated]) -> list[str]:
     logger.debug("Files to create")
     logger.debug(files)
 
-    not_created = []
-    for file in files:
-        if not _create_file(file.path, file.content):
-            not_created.append(file.path)
+    paths = [file.path for file in files]
+    statuses = await asyncio.to_thread(
+        _write_and_record, [(file.path, file.content) for file in files])
+    report = await asyncio.to_thread(current_workspace().validator.validate, _project_root(paths))
 
-    logger.debug("Files not created")
-    logger.debug(not_created)
     logger.debug("create_files_with_schema end")
 
-    return not_created
+    return {"files": statuses, "validation": report.model_dump(exclude={"seconds"})}
+
+
+@tool(parse_docstring=True)
+async def validate_project() -> dict:
+    """
+    Function that validates the generated project without any model call: JSON configs
+    (angular.json, package.json, tsconfig.json), relative imports between files and the
+    component elements used in templates.
+    Returns the validation report.
+    """
+    logger.debug("validate_project init")
+
+    report = await asyncio.to_thread(current_workspace().validator.validate)
+
+    logger.debug("validate_project end")
+
+    return report.model_dump(exclude={"seconds"})
 
 
 @tool(parse_docstring=True)
-def check_files(file_names: list[str]) -> list[str]:
+async def check_files(file_names: list[str]) -> list[str]:
     """
     Function that checks if a list of files exist in the predefined folder.
     Returns a list of file names that do not exist.
@@ -129,10 +137,7 @@ def check_files(file_names: list[str]) -> list[str]:
     logger.debug("Files to check existence")
     logger.debug(file_names)
 
-    not_exists = []
-    for file_name in file_names:
-        if not os.path.isfile(file_name):
-            not_exists.append(file_name)
+    not_exists = await asyncio.to_thread(current_workspace().manifest.missing, file_names)
 
     if len(not_exists) > 0:
         logger.debug("Files not created")
@@ -140,13 +145,13 @@ def check_files(file_names: list[str]) -> list[str]:
     else:
         logger.debug("All files exist")
 
-    logger.debug("create_files_with_schema end")
+    logger.debug("check_files end")
 
     return not_exists
 
 
 @tool(parse_docstring=True)
-def read_file(file_name: str) -> str | None:
+async def read_file(file_name: str) -> str | None:
     """
     Function that reads a file
 
@@ -157,13 +162,14 @@ def read_file(file_name: str) -> str | None:
     logger.debug("File to read")
     logger.debug(file_name)
 
+    workspace = current_workspace()
     content = None
     try:
-        with open(f"{PROJECT_OUTPUT}/{file_name}", mode='r', encoding='utf-8') as file:
-            content = file.read()
+        content = await asyncio.to_thread(
+            workspace.manifest.read, os.path.join(workspace.root, file_name))
     except Exception as e:
         logger.error(
-            f"Error when reading file {file_name} in directory {PROJECT_OUTPUT}")
+            f"Error when reading file {file_name} in directory {workspace.root}")
         logger.error(e)
 
     logger.debug("file_name end")
@@ -171,27 +177,41 @@ def read_file(file_name: str) -> str | None:
     return content
 
 
-def _create_file(file_name: str, file_content: str) -> bool:
+@tool(parse_docstring=True)
+async def snapshot_files() -> int:
+    """
+    Function that records the current state of the project files.
+    Returns a snapshot id to pass to `changed_files` later.
     """
-    Function that creates a file in the predefined folder
+    logger.debug("snapshot_files init")
+
+    snapshot = await asyncio.to_thread(current_workspace().manifest.snapshot)
+
+    logger.debug("snapshot_files end")
+
+    return snapshot
+
+
+@tool(parse_docstring=True)
+async def changed_files(snapshot: int) -> dict[str, list[str] | str]:
+    """
+    Function that lists the project files added, modified and removed since a snapshot.
+    Use it to avoid reading files that did not change. Only the latest snapshots are
+    kept, an `error` is returned for older or unknown ids.
 
     Args:
-        file_name: str (name of the file to be created).
-        file_content: str (content of the file to be created).
+        snapshot: int (snapshot id returned by `snapshot_files`).
     """
-    basename = os.path.basename(file_name)
-    dir_file = '/'.join(file_name.split('/')[:-1])
-    dir_output = dir_file
+    logger.debug("changed_files init")
+
+    changes = {}
     try:
-        if not os.path.exists(dir_output):
-            os.makedirs(dir_output)
+        changes = await asyncio.to_thread(current_workspace().manifest.changed_since, snapshot)
+    except KeyError:
+        logger.error(f"Unknown snapshot {snapshot}")
+        changes = {"error": f"Unknown snapshot {snapshot}, call snapshot_files again"}
 
-        with open(f"{dir_output}/{basename}", mode='w', encoding='utf-8') as file:
-            file.write(file_content)
-        return True
-    except Exception as e:
-        logger.error(
-            f"Error when creating file {basename} in directory {dir_output}")
-        logger.error(e)
+    logger.debug(changes)
+    logger.debug("changed_files end")
 
-    return False
+    return changes
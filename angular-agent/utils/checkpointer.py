@@ -0,0 +1,405 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import zlib
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import WRITES_IDX_MAP, BaseCheckpointSaver, ChannelVersions, \
+    Checkpoint, CheckpointMetadata, CheckpointTuple, get_checkpoint_id, get_checkpoint_metadata, \
+    writes_sort_key
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from utils.constants import CHECKPOINT_PATH, CHECKPOINT_KEEP, CHECKPOINT_TTL, \
+    CHECKPOINT_PRUNE_EVERY
+from utils.logger import logger
+
+# Durable replacement of InMemorySaver for the supervisor graph.
+#
+# Every serialized value is stored once, zlib compressed, in `payloads` under the
+# sha256 of its bytes. Lists of messages (the `messages` channel and its writes) are
+# stored as the list of their message hashes, so the history repeated by every
+# checkpoint, and the generated file contents inside it, is only written once.
+#
+# Only the last `keep` checkpoints of each thread/namespace are kept and threads not
+# updated for `ttl` seconds are deleted. Pruning runs every `prune_every` checkpoints
+# and drops the payloads nothing references anymore. The graphs of this project use
+# no DeltaChannel, so older checkpoints are not needed to rebuild the kept ones.
+
+EMPTY = "empty"
+VALUE = "value"
+MESSAGES = "messages"
+# Project types found in the graph state (structured responses of the agents).
+ALLOWED_MODULES = [("schemas.file", "FileGenerated")]
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver[str]):
+    """SQLite backed checkpointer with compressed, deduplicated payloads."""
+
+    def __init__(self, path: str = CHECKPOINT_PATH, keep: int | None = CHECKPOINT_KEEP,
+                 ttl: float | None = CHECKPOINT_TTL, prune_every: int = CHECKPOINT_PRUNE_EVERY,
+                 **kwargs: Any):
+        kwargs.setdefault("serde", JsonPlusSerializer(
+            allowed_msgpack_modules=ALLOWED_MODULES))
+        super().__init__(**kwargs)
+        self.path = path
+        self.keep = keep
+        self.ttl = ttl
+        self.prune_every = prune_every
+        self._puts = 0
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript("""
+            CREATE TABLE IF NOT EXISTS payloads (
+                hash TEXT PRIMARY KEY,
+                type TEXT NOT NULL,
+                data BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                parent_checkpoint_id TEXT,
+                checkpoint BLOB NOT NULL,
+                metadata BLOB NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                version TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                ref TEXT,
+                PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+            );
+            CREATE TABLE IF NOT EXISTS writes (
+                thread_id TEXT NOT NULL,
+                checkpoint_ns TEXT NOT NULL,
+                checkpoint_id TEXT NOT NULL,
+                task_id TEXT NOT NULL,
+                idx INTEGER NOT NULL,
+                channel TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                ref TEXT,
+                task_path TEXT NOT NULL,
+                PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+            );""")
+        self._connection.commit()
+
+    # Payloads
+
+    def _store(self, value: Any) -> str:
+        type_, data = self.serde.dumps_typed(value)
+        key = hashlib.sha256(type_.encode("utf-8") + b"\0" + data).hexdigest()
+        self._connection.execute(
+            "INSERT OR IGNORE INTO payloads VALUES (?, ?, ?)", (key, type_, zlib.compress(data)))
+        return key
+
+    def _fetch(self, key: str) -> Any:
+        type_, data = self._connection.execute(
+            "SELECT type, data FROM payloads WHERE hash = ?", (key,)).fetchone()
+        return self.serde.loads_typed((type_, zlib.decompress(data)))
+
+    def _encode(self, value: Any) -> tuple[str, str]:
+        if isinstance(value, list) and value and all(isinstance(item, BaseMessage) for item in value):
+            return MESSAGES, json.dumps([self._store(item) for item in value])
+        return VALUE, self._store(value)
+
+    def _decode(self, kind: str, ref: str) -> Any:
+        if kind == MESSAGES:
+            return [self._fetch(key) for key in json.loads(ref)]
+        return self._fetch(ref)
+
+    def _dumps(self, value: Any) -> bytes:
+        type_, data = self.serde.dumps_typed(value)
+        return zlib.compress(json.dumps(type_).encode("utf-8") + b"\n" + data)
+
+    def _loads(self, data: bytes) -> Any:
+        type_, data = zlib.decompress(data).split(b"\n", 1)
+        return self.serde.loads_typed((json.loads(type_), data))
+
+    # Reads
+
+    def _tuple(self, row: tuple) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, checkpoint, metadata = row
+        checkpoint = self._loads(checkpoint)
+        values = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            blob = self._connection.execute(
+                "SELECT kind, ref FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                "AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version))).fetchone()
+            if blob is not None and blob[0] != EMPTY:
+                values[channel] = self._decode(*blob)
+
+        writes = self._connection.execute(
+            "SELECT task_id, idx, channel, kind, ref, task_path FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id)).fetchall()
+        writes.sort(key=lambda write: writes_sort_key(write[5], write[0], write[1]))
+
+        return CheckpointTuple(
+            config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                     "checkpoint_id": checkpoint_id}},
+            checkpoint={**checkpoint, "channel_values": values},
+            metadata=self._loads(metadata),
+            parent_config={"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                            "checkpoint_id": parent_checkpoint_id}}
+            if parent_checkpoint_id else None,
+            pending_writes=[(task_id, channel, self._decode(kind, ref))
+                            for task_id, _, channel, kind, ref, _ in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                 "checkpoint, metadata FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?")
+        parameters: tuple = (thread_id, checkpoint_ns)
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            parameters += (checkpoint_id,)
+        else:
+            query += " ORDER BY checkpoint_id DESC LIMIT 1"
+        with self._lock:
+            row = self._connection.execute(query, parameters).fetchone()
+            return self._tuple(row) if row is not None else None
+
+    def list(self, config: RunnableConfig | None, *, filter: dict[str, Any] | None = None,
+             before: RunnableConfig | None = None, limit: int | None = None) -> Iterator[CheckpointTuple]:
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                 "checkpoint, metadata FROM checkpoints WHERE 1 = 1")
+        parameters: tuple = ()
+        if config is not None:
+            query += " AND thread_id = ?"
+            parameters += (config["configurable"]["thread_id"],)
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                query += " AND checkpoint_ns = ?"
+                parameters += (checkpoint_ns,)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                parameters += (checkpoint_id,)
+        if before is not None and (before_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            parameters += (before_id,)
+        query += " ORDER BY thread_id, checkpoint_ns, checkpoint_id DESC"
+
+        with self._lock:
+            rows = self._connection.execute(query, parameters).fetchall()
+        for row in rows:
+            if limit is not None and limit <= 0:
+                break
+            with self._lock:
+                checkpoint = self._tuple(row)
+            if filter and not all(checkpoint.metadata.get(key) == value for key, value in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            yield checkpoint
+
+    # Writes
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        checkpoint = checkpoint.copy()
+        values: dict[str, Any] = checkpoint.pop("channel_values")  # type: ignore[misc]
+        with self._lock:
+            for channel, version in new_versions.items():
+                kind, ref = self._encode(values[channel]) if channel in values else (EMPTY, None)
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, channel, str(version), kind, ref))
+            self._connection.execute(
+                "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                 self._dumps(checkpoint), self._dumps(get_checkpoint_metadata(config, metadata)),
+                 time.time()))
+            self._connection.commit()
+            self._puts += 1
+            prune = self.prune_every > 0 and self._puts % self.prune_every == 0
+        if prune:
+            self.prune_old()
+        return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns,
+                                 "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]],
+                   task_id: str, task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            for index, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, index)
+                kind, ref = self._encode(value)
+                # Regular writes are kept from the first attempt, special ones (errors,
+                # interrupts) replace the previous value.
+                self._connection.execute(
+                    f"INSERT OR {'IGNORE' if idx >= 0 else 'REPLACE'} INTO writes "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, kind, ref, task_path))
+            self._connection.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for table in ("checkpoints", "blobs", "writes"):
+                self._connection.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._collect_payloads()
+            self._connection.commit()
+
+    # Retention
+
+    def _keep_latest(self, thread_id: str, checkpoint_ns: str, keep: int) -> int:
+        rows = self._connection.execute(
+            "SELECT checkpoint_id, checkpoint FROM checkpoints WHERE thread_id = ? "
+            "AND checkpoint_ns = ? ORDER BY checkpoint_id DESC",
+            (thread_id, checkpoint_ns)).fetchall()
+        removed = [checkpoint_id for checkpoint_id, _ in rows[keep:]]
+        if not removed:
+            return 0
+        for checkpoint_id in removed:
+            for table in ("checkpoints", "writes"):
+                self._connection.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "AND checkpoint_id = ?", (thread_id, checkpoint_ns, checkpoint_id))
+
+        versions = {(channel, str(version)) for _, checkpoint in rows[:keep]
+                    for channel, version in self._loads(checkpoint)["channel_versions"].items()}
+        blobs = self._connection.execute(
+            "SELECT channel, version FROM blobs WHERE thread_id = ? AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns)).fetchall()
+        for channel, version in blobs:
+            if (channel, version) not in versions:
+                self._connection.execute(
+                    "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "AND channel = ? AND version = ?", (thread_id, checkpoint_ns, channel, version))
+        return len(removed)
+
+    def _collect_payloads(self) -> int:
+        referenced = set()
+        for table in ("blobs", "writes"):
+            for kind, ref in self._connection.execute(f"SELECT kind, ref FROM {table}"):
+                if kind == MESSAGES:
+                    referenced.update(json.loads(ref))
+                elif kind == VALUE:
+                    referenced.add(ref)
+        stored = [key for key, in self._connection.execute("SELECT hash FROM payloads")]
+        unused = [(key,) for key in stored if key not in referenced]
+        self._connection.executemany("DELETE FROM payloads WHERE hash = ?", unused)
+        return len(unused)
+
+    def prune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        if strategy == "delete":
+            for thread_id in thread_ids:
+                self.delete_thread(thread_id)
+            return
+        if strategy != "keep_latest":
+            raise ValueError(f"Unknown prune strategy: {strategy}")
+        with self._lock:
+            for thread_id in thread_ids:
+                namespaces = self._connection.execute(
+                    "SELECT DISTINCT checkpoint_ns FROM checkpoints WHERE thread_id = ?",
+                    (thread_id,)).fetchall()
+                for checkpoint_ns, in namespaces:
+                    self._keep_latest(thread_id, checkpoint_ns, 1)
+            self._collect_payloads()
+            self._connection.commit()
+
+    def prune_old(self):
+        """
+        Function that deletes the threads not updated for `ttl` seconds and the
+        checkpoints beyond the last `keep` of every thread/namespace.
+        """
+        start = time.perf_counter()
+        with self._lock:
+            threads = 0
+            if self.ttl is not None:
+                expired = self._connection.execute(
+                    "SELECT thread_id FROM checkpoints GROUP BY thread_id HAVING MAX(created) < ?",
+                    (time.time() - self.ttl,)).fetchall()
+                for thread_id, in expired:
+                    for table in ("checkpoints", "blobs", "writes"):
+                        self._connection.execute(
+                            f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+                threads = len(expired)
+            checkpoints = 0
+            if self.keep is not None:
+                for thread_id, checkpoint_ns in self._connection.execute(
+                        "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints").fetchall():
+                    checkpoints += self._keep_latest(thread_id, checkpoint_ns, self.keep)
+            payloads = self._collect_payloads()
+            self._connection.commit()
+        logger.debug("Checkpoints pruned: %s threads, %s checkpoints, %s payloads in %.3f s",
+                     threads, checkpoints, payloads, time.perf_counter() - start)
+
+    # Async API, the SQLite calls run in a worker thread
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: RunnableConfig | None, *, filter: dict[str, Any] | None = None,
+                    before: RunnableConfig | None = None, limit: int | None = None) -> AsyncIterator[CheckpointTuple]:
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[tuple[str, Any]],
+                          task_id: str, task_path: str = "") -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    async def aprune(self, thread_ids: Sequence[str], *, strategy: str = "keep_latest") -> None:
+        await asyncio.to_thread(self.prune, thread_ids, strategy=strategy)
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    def stats(self) -> dict[str, int]:
+        """
+        Function that returns the number of stored rows and the size of the payloads.
+        """
+        with self._lock:
+            statistics = {table: self._connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                          for table in ("checkpoints", "blobs", "writes", "payloads")}
+            statistics["payload_bytes"] = self._connection.execute(
+                "SELECT COALESCE(SUM(LENGTH(data)), 0) FROM payloads").fetchone()[0]
+        return statistics
+
+
+def create_checkpointer() -> BaseCheckpointSaver:
+    """
+    Function that creates the checkpointer of the supervisor graph, in memory when
+    `CHECKPOINT_PATH` is empty.
+    """
+    if not CHECKPOINT_PATH:
+        from langgraph.checkpoint.memory import InMemorySaver
+
+        return InMemorySaver(serde=JsonPlusSerializer(allowed_msgpack_modules=ALLOWED_MODULES))
+    return SQLiteCheckpointer()
@@ -1 +1,112 @@
+import os
+from dotenv import load_dotenv
+
+# The only place the .env file is loaded: every setting below, and the API keys read by
+# the Google clients, come from the environment.
+load_dotenv()
+
 PROJECT_OUTPUT = "/home/angular-langchain/project_output"
+
+# "sequential" or "parallel" (code generation fan-out, see agents/supervisor.py)
+SUPERVISOR_MODE = os.getenv("SUPERVISOR_MODE", "sequential")
+# code_generator_agent invocations running at once in parallel mode
+CODE_GENERATION_CONCURRENCY = int(
+    os.getenv("CODE_GENERATION_CONCURRENCY", "4"))
+
+# "incremental" (the agents are told which existing files a request affects, see
+# utils/context.py) or "full" (the agents see the whole project every time)
+GENERATION_MODE = os.getenv("GENERATION_MODE", "incremental")
+
+# "streaming" (code_generator_agent answers with a JSON array of files written to disk as
+# they are parsed, the other agents only see their paths and hashes, see
+# utils/file_stream.py) or "structured" (one FileGenerated structured response per answer)
+FILE_OUTPUT_MODE = os.getenv("FILE_OUTPUT_MODE", "streaming")
+
+# Threads used to write generated files (utils/file_writer.py)
+FILE_WRITER_THREADS = int(os.getenv("FILE_WRITER_THREADS", "8"))
+# Validation of the generated project (utils/validation.py): worker processes, used only
+# when at least VALIDATION_MIN_PARALLEL_FILES files changed since the last validation
+VALIDATION_WORKERS = int(os.getenv("VALIDATION_WORKERS", str(os.cpu_count() or 1)))
+VALIDATION_MIN_PARALLEL_FILES = int(os.getenv("VALIDATION_MIN_PARALLEL_FILES", "500"))
+# Largest file whose content the project manifest keeps in memory (utils/project_manifest.py)
+MANIFEST_MAX_CACHED_BYTES = 256 * 1024
+# Snapshots of the project manifest kept for `changed_files`, the oldest are dropped
+MANIFEST_MAX_SNAPSHOTS = 16
+
+# Logging (see utils/logger.py): file written by a background thread, rotated at
+# LOG_MAX_BYTES with LOG_BACKUP_COUNT old files kept
+LOG_PATH = os.getenv("LOG_PATH", "app.log")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "DEBUG")
+LOG_CONSOLE_LEVEL = os.getenv("LOG_CONSOLE_LEVEL", "INFO")
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "3"))
+# Characters of a logged payload (argument or message object) before it is truncated
+LOG_MAX_PAYLOAD = 2000
+# Records with a truncated payload kept per call site, then one in LOG_SAMPLE_EVERY
+LOG_SAMPLE_FIRST = 20
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "10"))
+
+CACHE_DIR = os.getenv(
+    "CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), ".cache")
+)
+
+# LLM response cache (see utils/llm_cache.py), disabled when the path is empty
+LLM_CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH", os.path.join(CACHE_DIR, "llm.sqlite"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1000"))
+LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+# Cosine similarity needed for a semantic hit, 1 disables the semantic tier
+LLM_CACHE_SEMANTIC_THRESHOLD = float(
+    os.getenv("LLM_CACHE_SEMANTIC_THRESHOLD", "1"))
+
+# Model input compaction (see utils/history.py): history tokens above which older turns
+# are summarized, last messages kept verbatim and largest tool output kept verbatim
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "12000"))
+HISTORY_KEEP_RECENT = 6
+HISTORY_MAX_TOOL_TOKENS = 500
+
+# Tokens of the model input of the code and project generator agents (utils/context.py)
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "16000"))
+
+# Run metrics (see utils/metrics.py): JSON lines appended per run and Prometheus text,
+# each disabled when empty
+METRICS_PATH = os.getenv("METRICS_PATH", os.path.join(CACHE_DIR, "metrics.jsonl"))
+METRICS_PROMETHEUS_PATH = os.getenv(
+    "METRICS_PROMETHEUS_PATH", os.path.join(CACHE_DIR, "metrics.prom"))
+
+# Checkpoints of the supervisor graph (see utils/checkpointer.py), in memory when empty
+CHECKPOINT_PATH = os.getenv(
+    "CHECKPOINT_PATH", os.path.join(CACHE_DIR, "checkpoints.sqlite"))
+# Checkpoints kept per thread, threads deleted after CHECKPOINT_TTL seconds without updates
+CHECKPOINT_KEEP = int(os.getenv("CHECKPOINT_KEEP", "20"))
+CHECKPOINT_TTL = float(os.getenv("CHECKPOINT_TTL", str(30 * 24 * 3600)))
+CHECKPOINT_PRUNE_EVERY = 100
+
+# Persistent documentation indexes (see retrieval/index.py)
+DOCUMENTATION_INDEX_DIR = os.getenv(
+    "DOCUMENTATION_INDEX_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), ".index")
+)
+# "local" selects the offline hash embedder (retrieval/embedding.py)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/embedding-001")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "50"))
+EMBEDDING_CONCURRENCY = int(os.getenv("EMBEDDING_CONCURRENCY", "4"))
+EMBEDDING_REQUESTS_PER_MINUTE = float(
+    os.getenv("EMBEDDING_REQUESTS_PER_MINUTE", "60"))
+EMBEDDING_MAX_RETRIES = 5
+# "markdown" (headings and code fences, retrieval/markdown.py) or "recursive"
+DOCUMENTATION_CHUNKER = os.getenv("DOCUMENTATION_CHUNKER", "markdown")
+CHUNK_SIZE = 2000
+CHUNK_OVERLAP = 200
+# "hybrid" (BM25 + embeddings), "lexical" (offline BM25) or "dense" (embeddings)
+DOCUMENTATION_RETRIEVAL_MODE = os.getenv(
+    "DOCUMENTATION_RETRIEVAL_MODE", "hybrid")
+# Candidates taken from each retriever before fusion
+DOCUMENTATION_CANDIDATES = 20
+# Maximum tokens returned by one search_documentation call
+DOCUMENTATION_TOKEN_BUDGET = 1500
+# Search results kept in memory by the query cache (retrieval/cache.py)
+DOCUMENTATION_QUERY_CACHE_SIZE = 256
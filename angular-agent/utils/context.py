@@ -0,0 +1,195 @@
+import json
+import logging
+import re
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from utils.constants import PROJECT_OUTPUT, CONTEXT_TOKEN_BUDGET, GENERATION_MODE
+from utils.history import compact_history, history_tokens, message_tokens, record_turn
+from utils.tokens import count_tokens, truncate_to_tokens
+from utils.workspace import current_workspace
+from utils.logger import logger
+
+# Token budgeted model input of the code and project generator agents (their
+# `pre_model_hook`). The prompts name PROJECT_OUTPUT as the project root; the system
+# prompt message of each session root (utils/workspace.py) and its token count are
+# prepared once. On every call the compacted history (utils/history.py) is packed into
+# what the budget leaves after the prompt:
+#
+# 1. The user messages (the task) are always sent.
+# 2. The other messages are added newest first, a tool call together with its
+#    results, until one does not fit.
+# 3. Documentation search results that do not fit are cut at a chunk boundary
+#    instead of being dropped, as long as `MIN_DOCUMENTATION_TOKENS` remain.
+#
+# In the incremental generation mode the system prompt is followed by the state of
+# the project: how many files already exist and which of them the current request
+# affects (utils/dependency_map.py), so follow-up requests do not make the agents
+# list, check and regenerate the whole project.
+
+DOCUMENTATION_TOOLS = frozenset(("search_documentation",))
+MIN_DOCUMENTATION_TOKENS = 200
+# Tools whose calls or results carry the files generated for the request.
+FILE_TOOLS = frozenset(("generate_code", "create_files", "create_files_with_schema"))
+# System messages kept per agent, one per session root.
+MAX_SESSION_PROMPTS = 64
+
+PROJECT_CONTEXT = (
+    "# PROJECT STATE (incremental generation):\n"
+    "The project at `{root}` already contains {count} files. Only the existing files listed "
+    "below are affected by the current request, every other file is up to date: **DO NOT** "
+    "list, check, read or regenerate them.\n"
+    "{affected}"
+)
+NO_AFFECTED_FILES = "No existing file is affected by the current request: only handle the new files it needs."
+
+
+def group_turns(messages: list[BaseMessage]) -> list[list[int]]:
+    """
+    Function that groups message indices in turns: a model message with tool calls
+    and the tool messages answering it, or a single message.
+
+    Args:
+        messages: list[BaseMessage] (history, oldest first).
+    """
+    turns: list[list[int]] = []
+    for index, message in enumerate(messages):
+        if isinstance(message, ToolMessage) and turns and \
+                isinstance(messages[turns[-1][0]], AIMessage) and messages[turns[-1][0]].tool_calls:
+            turns[-1].append(index)
+        else:
+            turns.append([index])
+    return turns
+
+
+def truncate_documentation(message: ToolMessage, tokens: int) -> ToolMessage:
+    content = truncate_to_tokens(message.content, tokens)
+    # Chunks are joined with blank lines by format_documents.
+    if "\n\n" in content:
+        content = content[:content.rindex("\n\n")]
+    return message.model_copy(update={"content": content})
+
+
+def current_request(messages: list[BaseMessage]) -> list[BaseMessage]:
+    """
+    Function that returns the messages of the current request: the ones after the
+    final answer of the supervisor to the previous request, or all of them.
+
+    Args:
+        messages: list[BaseMessage] (history, oldest first).
+    """
+    last_user = max((index for index, message in enumerate(messages)
+                     if isinstance(message, HumanMessage)), default=-1)
+    for index in range(last_user - 1, -1, -1):
+        message = messages[index]
+        if isinstance(message, AIMessage) and message.name == "supervisor" and not message.tool_calls:
+            return messages[index + 1:]
+    return messages
+
+
+def project_context(messages: list[BaseMessage]) -> str | None:
+    """
+    Function that describes the existing files affected by the current request, None
+    when the project is still empty.
+
+    Args:
+        messages: list[BaseMessage] (history, oldest first).
+    """
+    dependency_map = current_workspace().dependency_map
+    files = dependency_map.refresh()
+    if not files:
+        return None
+    request = current_request(messages)
+    # Component names are matched on what the user and the agents wrote, not on
+    # documentation or other tool results.
+    text = "\n".join(message.content for message in request
+                     if isinstance(message, (HumanMessage, AIMessage)) and isinstance(message.content, str))
+    generated = text + "".join(
+        json.dumps(call["args"]) for message in request if isinstance(message, AIMessage)
+        for call in message.tool_calls if call["name"] in FILE_TOOLS) + "".join(
+        message.content for message in request
+        if isinstance(message, ToolMessage) and message.name in FILE_TOOLS and isinstance(message.content, str))
+    root = dependency_map.manifest.root
+    paths = re.findall(re.escape(root) + r"/[\w.@/-]+", generated)
+
+    affected = dependency_map.affected(text, paths)
+    return PROJECT_CONTEXT.format(
+        root=root, count=len(files),
+        affected="\n".join(dependency_map.describe(path) for path in affected) or NO_AFFECTED_FILES)
+
+
+class ContextBuilder:
+    """Packs the system prompt, documentation and history of an agent in a token budget."""
+
+    def __init__(self, name: str, prompt: str, budget: int = CONTEXT_TOKEN_BUDGET,
+                 incremental: bool = GENERATION_MODE == "incremental"):
+        self.name = name
+        self.budget = budget
+        self.incremental = incremental
+        self.prompt = prompt
+        # Project root -> system message and its tokens.
+        self._system_messages: dict[str, tuple[SystemMessage, int]] = {}
+
+    def system_message(self, root: str) -> tuple[SystemMessage, int]:
+        if root not in self._system_messages:
+            if len(self._system_messages) >= MAX_SESSION_PROMPTS:
+                del self._system_messages[next(iter(self._system_messages))]
+            prompt = self.prompt.replace(PROJECT_OUTPUT, root)
+            self._system_messages[root] = (SystemMessage(content=prompt), count_tokens(prompt))
+        return self._system_messages[root]
+
+    def build(self, messages: list[BaseMessage]) -> list[BaseMessage]:
+        """
+        Function that returns the model input for a history.
+
+        Args:
+            messages: list[BaseMessage] (history, oldest first).
+        """
+        history = compact_history(messages)
+        system_message, prompt_tokens = self.system_message(current_workspace().root)
+        available = self.budget - prompt_tokens
+        context = project_context(messages) if self.incremental else None
+        if context:
+            system_message = SystemMessage(content=f"{system_message.content}\n\n{context}")
+            available -= count_tokens(context)
+        selected: dict[int, BaseMessage] = {}
+        for index, message in enumerate(history):
+            if isinstance(message, HumanMessage):
+                selected[index] = message
+                available -= message_tokens(message)
+
+        turns = [turn for turn in group_turns(history)
+                 if not isinstance(history[turn[0]], HumanMessage)]
+        for position, turn in enumerate(reversed(turns)):
+            tokens = sum(message_tokens(history[index]) for index in turn)
+            if tokens <= available or position == 0:
+                # The latest turn is always sent, even over the budget.
+                selected.update((index, history[index]) for index in turn)
+                available -= tokens
+                continue
+
+            documentation = [index for index in turn
+                             if isinstance(history[index], ToolMessage)
+                             and history[index].name in DOCUMENTATION_TOOLS]
+            rest = tokens - \
+                sum(message_tokens(history[index]) for index in documentation)
+            share = (available - rest) // max(len(documentation), 1)
+            if documentation and share >= MIN_DOCUMENTATION_TOKENS:
+                for index in turn:
+                    selected[index] = truncate_documentation(history[index], share) \
+                        if index in documentation else history[index]
+            break
+
+        return [system_message] + [selected[index] for index in sorted(selected)]
+
+    def __call__(self, state: dict) -> dict:
+        messages = state["messages"]
+        context = self.build(messages)
+        if logger.isEnabledFor(logging.DEBUG):
+            documentation = sum(message_tokens(message) for message in context
+                                if isinstance(message, ToolMessage) and message.name in DOCUMENTATION_TOOLS)
+            logger.debug("%s context: prompt %s, documentation %s, history %s tokens", self.name,
+                         message_tokens(context[0]), documentation, history_tokens(context[1:]) - documentation)
+        # Same system message (prompt and project context) on both sides, only the history
+        # differs.
+        record_turn(self.name, message_tokens(context[0]) + history_tokens(messages),
+                    history_tokens(context))
+        return {"llm_input_messages": context}
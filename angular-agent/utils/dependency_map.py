@@ -0,0 +1,148 @@
+import os
+import re
+import threading
+from utils.project_manifest import ProjectManifest, project_manifest
+from utils.logger import logger
+from utils.project_checks import SELECTOR_PATTERN, parse_imports, resolve_import
+
+# Dependency map of the generated project, used by the incremental generation mode
+# (see utils/context.py): the relative imports between the `.ts` files under the
+# project root (plus the templates and styles the components point to) and the files
+# of each component. Components are the `.ts` files declaring a `selector` or named
+# `*.component.ts`; their template, styles and spec next to them share their stem
+# (`calculator.component.ts`, `calculator.component.html` -> `calculator`). Other files
+# (configs, `main.ts`, `app.config.ts`, services) are no component. The root components
+# are the ones `main.ts` bootstraps. It is derived from the project manifest and only
+# reparses the files whose hash changed.
+
+# Files of a component, after its stem.
+COMPONENT_SUFFIXES = (".ts", ".html", ".css", ".scss", ".sass", ".less", ".spec.ts")
+ROUTES_SUFFIX = ".routes.ts"
+# Requests adding components, which have to be wired in the root component and routes.
+NEW_COMPONENTS_PATTERN = re.compile(
+    r"\b(?:add|create|generate|new)\b[^.\n]*\bcomponents?\b", re.IGNORECASE)
+
+
+def component_stem(path: str) -> str:
+    return os.path.basename(path)[:-len(".ts")]
+
+
+def component_name(path: str) -> str:
+    return os.path.basename(path).split(".")[0]
+
+
+class DependencyMap:
+    """Imports, importers and component files of the project in the manifest."""
+
+    def __init__(self, manifest: ProjectManifest = project_manifest):
+        self.manifest = manifest
+        self.imports: dict[str, list[str]] = {}
+        self.importers: dict[str, set[str]] = {}
+        self.components: dict[str, set[str]] = {}
+        self.roots: set[str] = set()
+        self.routes: set[str] = set()
+        # Path -> hash of the content parsed, its imports and whether it declares a selector.
+        self._parsed: dict[str, tuple[str, list[str], bool]] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self) -> list[str]:
+        """
+        Function that brings the map up to date with the manifest and returns the
+        project files.
+        """
+        files = {path: entry for path, entry in self.manifest.files().items()
+                 if path.startswith(self.manifest.root + os.sep)}
+        with self._lock:
+            parsed = 0
+            for path, entry in files.items():
+                if not path.endswith(".ts") or self._parsed.get(path, ("",))[0] == entry.sha256:
+                    continue
+                try:
+                    content = entry.content if entry.content is not None else self.manifest.read(path)
+                except (OSError, UnicodeDecodeError):
+                    content = ""
+                self._parsed[path] = (entry.sha256, parse_imports(content),
+                                      SELECTOR_PATTERN.search(content) is not None)
+                parsed += 1
+            for path in self._parsed.keys() - files.keys():
+                del self._parsed[path]
+
+            self.imports = {path: self._resolve(path, specifiers, files)
+                            for path, (_, specifiers, _) in self._parsed.items()}
+            self.importers = {}
+            for path, imports in self.imports.items():
+                for imported in imports:
+                    self.importers.setdefault(imported, set()).add(path)
+            self.components = {}
+            for path, (_, _, selector) in self._parsed.items():
+                if not (selector or path.endswith(".component.ts")) or path.endswith(".spec.ts"):
+                    continue
+                stem = os.path.join(os.path.dirname(path), component_stem(path))
+                self.components.setdefault(component_name(path), set()).update(
+                    stem + suffix for suffix in COMPONENT_SUFFIXES if stem + suffix in files)
+            components = self._all_files()
+            self.roots = {imported for path in self.imports if os.path.basename(path) == "main.ts"
+                          for imported in self.imports[path] if imported in components}
+            self.routes = {path for path in files if path.endswith(ROUTES_SUFFIX)}
+        if parsed:
+            logger.debug("Dependency map parsed %s of %s files", parsed, len(files))
+        return sorted(files)
+
+    @staticmethod
+    def _resolve(path: str, specifiers: list[str], files: dict) -> list[str]:
+        resolved = (resolve_import(path, specifier, files) for specifier in specifiers)
+        return sorted({target for target in resolved if target})
+
+    def affected(self, text: str, paths: list[str] = ()) -> list[str]:
+        """
+        Function that returns the existing files a request touches: the files of the
+        components it names, the files it mentions and the files importing them. The
+        root components and the routes are affected by every request adding components.
+
+        Args:
+            text: str (request, used to match component names).
+            paths: list[str] (files mentioned by the request or generated for it).
+        """
+        existing = set(self.refresh())
+        with self._lock:
+            seeds = {os.path.abspath(path) for path in paths} & existing
+            if NEW_COMPONENTS_PATTERN.search(text):
+                seeds |= self.routes
+                for files in self.components.values():
+                    if files & self.roots:
+                        seeds |= files
+            text = text.lower()
+            for name, files in self.components.items():
+                # The name of the root component (`app`) is too common a word to match.
+                if files & self.roots:
+                    continue
+                if name and re.search(rf"(?<![\w-]){re.escape(name.lower())}(?![\w-])", text):
+                    seeds |= files
+            # Files importing a changed file may have to change with it.
+            importers = {importer for path in seeds for importer in self.importers.get(path, ())}
+            return sorted(seeds | importers)
+
+    def _all_files(self) -> set[str]:
+        return {path for files in self.components.values() for path in files}
+
+    def describe(self, path: str) -> str:
+        """
+        Function that returns one line with a file, its imports and its importers,
+        relative to the project root.
+
+        Args:
+            path: str (absolute path of the file).
+        """
+        def relative(paths) -> str:
+            return ", ".join(sorted(os.path.relpath(item, self.manifest.root) for item in paths))
+
+        line = f"- {os.path.relpath(path, self.manifest.root)}"
+        details = []
+        if self.imports.get(path):
+            details.append(f"imports {relative(self.imports[path])}")
+        if self.importers.get(path):
+            details.append(f"imported by {relative(self.importers[path])}")
+        return line + (f" ({'; '.join(details)})" if details else "")
+
+
+dependency_map = DependencyMap()
@@ -0,0 +1,250 @@
+import json
+import os
+import re
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import LLMResult
+from schemas.file import FileGenerated, FileWriteStatus
+from utils.constants import FILE_WRITER_THREADS
+from utils.file_writer import content_hash, write_files
+from utils.project_manifest import ProjectManifest, project_manifest
+from utils.logger import logger
+
+# Streaming file output of code_generator_agent (FILE_OUTPUT_MODE "streaming").
+#
+# The agent answers with a JSON array of `FileGenerated` objects instead of a structured
+# response. While the answer streams in, `FileStreamHandler` feeds the tokens to a
+# `FileStreamParser` and every object is written to disk as soon as its closing brace
+# arrives. Once the answer is complete, `FileOutputHook` replaces it in the agent state
+# with the paths and hashes of the written files, so the file contents are never sent
+# to the supervisor or to project_generator_agent:
+#
+#   [{"path": ".../calculator.component.ts", "sha256": "9f2c...", "status": "created"}]
+#
+# Answers that were not streamed (response cache hits, models without streaming) are
+# parsed and written by the hook. Both write through the streamed files of the current
+# workspace (utils/workspace.py) unless they are given their own.
+
+# Characters that change the parser state outside and inside JSON strings.
+STRUCTURE_PATTERN = re.compile(r'[{}"]')
+STRING_PATTERN = re.compile(r'["\\]')
+WRITTEN_FIELDS = {"path", "sha256", "status", "error"}
+
+
+class FileStreamParser:
+    """Incremental parser of the JSON `FileGenerated` objects of a model answer."""
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+
+    def feed(self, text: str) -> list[FileGenerated]:
+        """
+        Function that adds text to the answer and returns the files completed by it.
+
+        Args:
+            text: str (next part of the answer).
+        """
+        self.buffer += text
+        files = []
+        while True:
+            if self.in_string:
+                match = STRING_PATTERN.search(self.buffer, self.position)
+                if match is None:
+                    self.position = len(self.buffer)
+                    break
+                if match.group() == "\\":
+                    # The escaped character may still be on its way.
+                    if match.end() == len(self.buffer):
+                        self.position = match.start()
+                        break
+                    self.position = match.end() + 1
+                    continue
+                self.in_string = False
+                self.position = match.end()
+                continue
+
+            match = STRUCTURE_PATTERN.search(self.buffer, self.position)
+            if match is None:
+                # Text between objects (brackets, commas, code fences) is dropped.
+                if self.depth == 0:
+                    self.buffer, self.position = "", 0
+                else:
+                    self.position = len(self.buffer)
+                break
+            self.position = match.end()
+            if match.group() == '"':
+                self.in_string = self.depth > 0
+            elif match.group() == "{":
+                if self.depth == 0:
+                    self.buffer, self.position = self.buffer[match.start():], 1
+                self.depth += 1
+            elif self.depth > 0:
+                self.depth -= 1
+                if self.depth == 0:
+                    files += self._load(self.buffer[:self.position])
+                    self.buffer, self.position = self.buffer[self.position:], 0
+        return files
+
+    @staticmethod
+    def _load(text: str) -> list[FileGenerated]:
+        try:
+            value = json.loads(text)
+        except ValueError:
+            logger.warning("Skipping invalid JSON object in the generated files")
+            return []
+        # {"files": [...]} is accepted too, it is only written once complete.
+        values = value.get("files") if isinstance(value.get("files"), list) else [value]
+        return [FileGenerated(path=item["path"], content=item["content"]) for item in values
+                if isinstance(item, dict) and isinstance(item.get("path"), str)
+                and isinstance(item.get("content"), str)]
+
+
+def parse_files(text: str) -> list[FileGenerated]:
+    return FileStreamParser().feed(text)
+
+
+class StreamedFiles:
+    """Writes files as soon as they are parsed, once per path and content."""
+
+    def __init__(self, manifest: ProjectManifest = project_manifest,
+                 threads: int = FILE_WRITER_THREADS):
+        self.manifest = manifest
+        self.threads = threads
+        # (path, hash of the content) -> pending or finished write.
+        self._writes: dict[tuple[str, str], Future] = {}
+        self._executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(file: FileGenerated) -> tuple[str, str]:
+        return os.path.abspath(file.path), content_hash(file.content)
+
+    def _write(self, file: FileGenerated) -> FileWriteStatus:
+        status = write_files([(file.path, file.content)], max_workers=1)[0]
+        if status.status != "failed":
+            self.manifest.record(status.path, file.content)
+        logger.debug("Streamed %s (%s)", status.path, status.status)
+        return status
+
+    def submit(self, file: FileGenerated) -> Future:
+        """
+        Function that starts writing a file in the background, unless the same content
+        is already being written to the same path.
+
+        Args:
+            file: FileGenerated (file to write).
+        """
+        key = self._key(file)
+        with self._lock:
+            if key not in self._writes:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.threads)
+                self._writes[key] = self._executor.submit(self._write, file)
+            return self._writes[key]
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def wait(self, files: list[FileGenerated]) -> list[FileWriteStatus]:
+        """
+        Function that returns the status of each file, writing the ones that were not
+        streamed.
+
+        Args:
+            files: list[FileGenerated] (files of a complete answer).
+        """
+        futures = [self.submit(file) for file in files]
+        statuses = [future.result() for future in futures]
+        with self._lock:
+            for file in files:
+                self._writes.pop(self._key(file), None)
+        return statuses
+
+
+streamed_files = StreamedFiles()
+
+
+def session_files() -> StreamedFiles:
+    # utils/workspace.py imports this module.
+    from utils.workspace import current_workspace
+
+    return current_workspace().streamed_files
+
+
+class FileStreamHandler(BaseCallbackHandler):
+    """Writes the files of a streamed model answer as they are completed."""
+
+    # Tokens must be parsed in order, in the context of the session that streams them.
+    run_inline = True
+
+    def __init__(self, files: StreamedFiles | None = None):
+        self.files = files
+        # Run id -> parser and streamed files of the answer.
+        self._parsers: dict[UUID, tuple[FileStreamParser, StreamedFiles]] = {}
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any):
+        if run_id not in self._parsers:
+            self._parsers[run_id] = (FileStreamParser(), self.files or session_files())
+        parser, files = self._parsers[run_id]
+        for file in parser.feed(token):
+            files.submit(file)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        self._parsers.pop(run_id, None)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._parsers.pop(run_id, None)
+
+
+def written_files(statuses: list[FileWriteStatus]) -> str:
+    return json.dumps([status.model_dump(include=WRITTEN_FIELDS, exclude_none=True)
+                       for status in statuses])
+
+
+def parse_written_files(text: str) -> list[FileWriteStatus]:
+    """
+    Function that returns the written files listed in an answer replaced by
+    `FileOutputHook`, an empty list for any other answer.
+
+    Args:
+        text: str (answer of code_generator_agent).
+    """
+    try:
+        values = json.loads(text)
+    except ValueError:
+        return []
+    if not isinstance(values, list):
+        return []
+    return [FileWriteStatus(**value) for value in values
+            if isinstance(value, dict) and "sha256" in value and "content" not in value]
+
+
+class FileOutputHook:
+    """Post model hook replacing the generated files of the final answer by their paths and hashes."""
+
+    def __init__(self, files: StreamedFiles | None = None):
+        self.files = files
+
+    def __call__(self, state: dict) -> dict:
+        message = state["messages"][-1]
+        if not isinstance(message, AIMessage) or message.tool_calls:
+            return {}
+        files = parse_files(message.text)
+        if not files:
+            return {}
+        statuses = (self.files or session_files()).wait(files)
+        failed = [status.path for status in statuses if status.status == "failed"]
+        if failed:
+            logger.error("Generated files not written: %s", failed)
+        # Same id: the answer is replaced, not appended.
+        return {"messages": [message.model_copy(update={"content": written_files(statuses)})]}
@@ -0,0 +1,108 @@
+import hashlib
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from schemas.file import FileWriteStatus
+from utils.constants import FILE_WRITER_THREADS
+from utils.logger import logger
+
+# Batch file writer used by the file system tools: every directory is created once,
+# files are written concurrently, each one through a temporary file renamed over the
+# target (readers never see a half-written file) and writes whose content hash
+# already matches the file on disk are skipped. The temporary file gets the mode of the
+# file it replaces, or the one `open` would give a new file.
+
+# Read once: os.umask can only be read by setting it, for the whole process.
+_UMASK = os.umask(0o022)
+os.umask(_UMASK)
+
+
+def content_hash(content: str | bytes) -> str:
+    if isinstance(content, str):
+        content = content.encode("utf-8")
+    return hashlib.sha256(content).hexdigest()
+
+
+def file_hash(path: str) -> str | None:
+    try:
+        with open(path, mode='rb') as file:
+            return hashlib.file_digest(file, "sha256").hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def _write_file(path: str, content: str) -> FileWriteStatus:
+    start = time.perf_counter()
+    try:
+        # Content that is not valid UTF-8 (lone surrogates) fails like any other write.
+        data = content.encode("utf-8")
+        digest = content_hash(data)
+        existing = None
+        if os.path.isfile(path) and os.path.getsize(path) == len(data):
+            existing = file_hash(path)
+        if existing == digest:
+            status = "unchanged"
+        else:
+            try:
+                mode = os.stat(path).st_mode & 0o7777
+                status = "updated"
+            except FileNotFoundError:
+                mode = 0o666 & ~_UMASK
+                status = "created"
+            descriptor, tmp_path = tempfile.mkstemp(
+                dir=os.path.dirname(path) or ".", prefix=f".{os.path.basename(path)}.")
+            try:
+                # mkstemp creates the file readable by its owner only.
+                os.fchmod(descriptor, mode)
+                with os.fdopen(descriptor, mode='wb') as file:
+                    file.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        return FileWriteStatus(path=path, status=status, sha256=digest,
+                               seconds=time.perf_counter() - start)
+    except Exception as e:
+        logger.error(f"Error when creating file {path}")
+        logger.error(e)
+        return FileWriteStatus(path=path, status="failed", error=str(e),
+                               seconds=time.perf_counter() - start)
+
+
+def write_files(files: list[tuple[str, str]],
+                max_workers: int = FILE_WRITER_THREADS) -> list[FileWriteStatus]:
+    """
+    Function that writes a batch of files and returns the status of each one, in the
+    same order.
+
+    Args:
+        files: list[tuple[str, str]] (paths and contents).
+        max_workers: int (threads writing files concurrently).
+    """
+    failed_directories: dict[str, str] = {}
+    for directory in sorted({os.path.dirname(path) for path, _ in files}):
+        if not directory:
+            continue
+        try:
+            os.makedirs(directory, exist_ok=True)
+        except OSError as e:
+            logger.error(f"Error when creating directory {directory}")
+            logger.error(e)
+            failed_directories[directory] = str(e)
+
+    statuses: list[FileWriteStatus | None] = [None] * len(files)
+    pending = []
+    for i, (path, content) in enumerate(files):
+        error = failed_directories.get(os.path.dirname(path))
+        if error is not None:
+            statuses[i] = FileWriteStatus(path=path, status="failed", error=error)
+        else:
+            pending.append(i)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+            for i, status in zip(pending, executor.map(lambda i: _write_file(*files[i]), pending)):
+                statuses[i] = status
+
+    return statuses
@@ -0,0 +1,182 @@
+import json
+from collections.abc import Callable
+from typing import Any
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from utils.constants import HISTORY_TOKEN_BUDGET, HISTORY_KEEP_RECENT, HISTORY_MAX_TOOL_TOKENS
+from utils.file_writer import content_hash
+from utils.workspace import current_workspace
+from utils.tokens import count_tokens
+from utils.logger import logger
+
+# Compaction of the message history sent to the models (`pre_model_hook` of the agents
+# and the supervisor). The graph state keeps the full history, only the model input
+# is compacted:
+#
+# 1. File contents already written to disk (same hash in the project manifest of the
+#    session, see utils/workspace.py) are replaced by a reference with the path and
+#    the hash.
+# 2. Tool outputs larger than `max_tool_tokens` outside the last `keep_recent`
+#    messages are replaced by a reference with their size and hash.
+# 3. If the history is still over `budget` tokens, the model and tool messages older
+#    than the last `keep_recent` ones are replaced by a one line per message summary.
+#    The user messages are always kept.
+
+SUMMARY_LINE_CHARACTERS = 160
+
+# Prompt tokens per model call before and after compaction, by agent name.
+compaction_stats: dict[str, dict[str, int]] = {}
+
+
+def message_tokens(message: BaseMessage) -> int:
+    tokens = count_tokens(message.content if isinstance(
+        message.content, str) else json.dumps(message.content))
+    if isinstance(message, AIMessage) and message.tool_calls:
+        tokens += count_tokens(json.dumps([call["args"]
+                               for call in message.tool_calls]))
+    return tokens
+
+
+def history_tokens(messages: list[BaseMessage]) -> int:
+    return sum(message_tokens(message) for message in messages)
+
+
+def file_reference(path: str, content: str) -> str | None:
+    """
+    Function that returns the reference replacing a file content when that content is
+    already on disk and longer than the reference, None otherwise.
+
+    Args:
+        path: str (path of the file).
+        content: str (content of the file in the history).
+    """
+    digest = content_hash(content)
+    entry = current_workspace().manifest.get(path)
+    if entry is None or entry.sha256 != digest:
+        return None
+    reference = f"<written to {path}, sha256 {digest[:12]}>"
+    # Small files are cheaper than their reference.
+    return reference if len(reference) < len(content) else None
+
+
+def _compact_files(value: Any) -> Any:
+    # FileGenerated lists ({"path", "content"}) and create_files dictionaries (path -> content)
+    if isinstance(value, list):
+        return [_compact_files(item) for item in value]
+    if isinstance(value, dict):
+        if isinstance(value.get("path"), str) and isinstance(value.get("content"), str):
+            reference = file_reference(value["path"], value["content"])
+            return {**value, "content": reference} if reference else value
+        return {key: (file_reference(key, item) or item)
+                if isinstance(item, str) and key.startswith("/") else _compact_files(item)
+                for key, item in value.items()}
+    return value
+
+
+def compact_files(message: BaseMessage) -> BaseMessage:
+    if isinstance(message, AIMessage) and message.tool_calls:
+        tool_calls = [{**call, "args": _compact_files(call["args"])}
+                      for call in message.tool_calls]
+        if tool_calls != message.tool_calls:
+            return message.model_copy(update={"tool_calls": tool_calls})
+    if isinstance(message, ToolMessage) and isinstance(message.content, str) \
+            and message.content.startswith(("[", "{")):
+        try:
+            files = json.loads(message.content)
+        except ValueError:
+            return message
+        compacted = _compact_files(files)
+        if compacted != files:
+            return message.model_copy(update={"content": json.dumps(compacted)})
+    return message
+
+
+def compact_tool_output(message: BaseMessage, max_tokens: int) -> BaseMessage:
+    if not isinstance(message, ToolMessage) or not isinstance(message.content, str):
+        return message
+    tokens = count_tokens(message.content)
+    if tokens <= max_tokens:
+        return message
+    return message.model_copy(update={"content": (
+        f"<output of {message.name} omitted: {tokens} tokens, "
+        f"sha256 {content_hash(message.content)[:12]}>")})
+
+
+def summarize(messages: list[BaseMessage]) -> HumanMessage:
+    lines = []
+    for message in messages:
+        text = message.content if isinstance(
+            message.content, str) else json.dumps(message.content)
+        text = " ".join(text.split())
+        if isinstance(message, AIMessage) and message.tool_calls:
+            text = f"called {', '.join(call['name'] for call in message.tool_calls)}. {text}"
+        if len(text) > SUMMARY_LINE_CHARACTERS:
+            text = text[:SUMMARY_LINE_CHARACTERS] + "..."
+        lines.append(f"- {message.name or message.type}: {text}")
+    return HumanMessage(content="Summary of the earlier steps of this conversation:\n" + "\n".join(lines))
+
+
+def compact_history(messages: list[BaseMessage], budget: int = HISTORY_TOKEN_BUDGET,
+                    keep_recent: int = HISTORY_KEEP_RECENT,
+                    max_tool_tokens: int = HISTORY_MAX_TOOL_TOKENS) -> list[BaseMessage]:
+    """
+    Function that returns the compacted copy of a message history.
+
+    Args:
+        messages: list[BaseMessage] (history, oldest first).
+        budget: int (tokens above which older turns are summarized).
+        keep_recent: int (last messages never summarized nor replaced by a reference).
+        max_tool_tokens: int (largest tool output kept verbatim outside the recent messages).
+    """
+    # A tool call and its results are kept or summarized together.
+    split = max(len(messages) - keep_recent, 0)
+    while 0 < split < len(messages) and isinstance(messages[split], ToolMessage):
+        split -= 1
+
+    compacted = [compact_files(message) for message in messages]
+    compacted = [compact_tool_output(message, max_tool_tokens) for message in compacted[:split]] + \
+        compacted[split:]
+    if split == 0 or history_tokens(compacted) <= budget:
+        return compacted
+
+    older = [message for message in compacted[:split]
+             if not isinstance(message, HumanMessage)]
+    kept = [message for message in compacted[:split]
+            if isinstance(message, HumanMessage)]
+    summarized = kept + [summarize(older)] + compacted[split:]
+    return summarized if history_tokens(summarized) < history_tokens(compacted) else compacted
+
+
+def record_turn(name: str, before: int, after: int):
+    """
+    Function that records and logs the prompt tokens of a model call before and after
+    compaction.
+
+    Args:
+        name: str (agent name).
+        before: int (tokens of the full input).
+        after: int (tokens sent to the model).
+    """
+    stats = compaction_stats.setdefault(
+        name, {"turns": 0, "tokens_before": 0, "tokens_after": 0})
+    stats["turns"] += 1
+    stats["tokens_before"] += before
+    stats["tokens_after"] += after
+    logger.debug("%s turn %s: prompt tokens %s -> %s", name, stats["turns"], before, after)
+
+
+def create_compaction_hook(name: str) -> Callable[[dict], dict]:
+    """
+    Function that creates the `pre_model_hook` compacting the model input of an agent
+    and recording the prompt tokens before and after.
+
+    Args:
+        name: str (agent name used in the logs and `compaction_stats`).
+    """
+    def compact(state: dict) -> dict:
+        messages = state["messages"]
+        compacted = compact_history(messages)
+        record_turn(name, history_tokens(messages), history_tokens(compacted))
+
+        return {"llm_input_messages": compacted}
+
+    return compact
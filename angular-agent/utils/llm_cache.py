@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import warnings
+from collections.abc import Sequence
+from typing import Any
+import numpy as np
+from langchain_core._api import LangChainBetaWarning
+from langchain_core.caches import BaseCache
+from langchain_core.embeddings import Embeddings
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+from utils.constants import LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL, \
+    LLM_CACHE_SEMANTIC_THRESHOLD
+from utils.logger import logger
+
+# Persistent response cache for the agent models (`cache=` of ChatGoogleGenerativeAI).
+#
+# Exact tier: key = sha256(normalized prompt + model parameters). The prompt is the
+# serialized message list; volatile ids are dropped and whitespace is collapsed so
+# reruns of the same conversation hit.
+# Semantic tier (optional): when no exact entry exists, the entry of the same model
+# whose prompt embedding has the highest cosine similarity above the threshold is used.
+#
+# Entries expire after `ttl` seconds and the least recently used ones are evicted
+# beyond `max_entries`.
+
+VOLATILE_KEYS = frozenset(("id", "tool_call_id", "run_id"))
+# Classes a cached response may contain, nothing else is deserialized.
+CACHED_CLASSES = [Generation, ChatGeneration, AIMessage]
+# `loads` warns that it is in beta on every cache hit.
+warnings.filterwarnings("ignore", message="The function `loads` is in beta",
+                        category=LangChainBetaWarning)
+# Misses whose response never reaches `update` (errors, cancelled runs) are forgotten
+# after PENDING_MAX_AGE seconds, and at most PENDING_MAX_ENTRIES are waited for.
+PENDING_MAX_AGE = 15 * 60
+PENDING_MAX_ENTRIES = 1024
+WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _normalize(item) for key, item in value.items()
+                if key not in VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_normalize(item) for item in value]
+    if isinstance(value, str):
+        return WHITESPACE.sub(" ", value).strip()
+    return value
+
+
+def normalize_prompt(prompt: str) -> str:
+    try:
+        return json.dumps(_normalize(json.loads(prompt)), sort_keys=True)
+    except ValueError:
+        return WHITESPACE.sub(" ", prompt).strip()
+
+
+class LLMResponseCache(BaseCache):
+    """SQLite backed LLM cache with LRU/TTL eviction and an optional semantic tier."""
+
+    def __init__(self, path: str = LLM_CACHE_PATH,
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES,
+                 ttl: float | None = LLM_CACHE_TTL,
+                 embedder: Embeddings | None = None,
+                 semantic_threshold: float = LLM_CACHE_SEMANTIC_THRESHOLD):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.embedder = embedder
+        self.semantic_threshold = semantic_threshold
+        self.statistics = {"hits": 0, "semantic_hits": 0, "misses": 0,
+                           "evictions": 0, "saved_seconds": 0.0}
+        # Start time of every lookup that missed, to record how long the model took,
+        # oldest first.
+        self._pending: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                llm_string TEXT NOT NULL,
+                value TEXT NOT NULL,
+                vector BLOB,
+                latency REAL NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )""")
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._connection.commit()
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def lookup(self, prompt: str, llm_string: str) -> Sequence[Generation] | None:
+        prompt = normalize_prompt(prompt)
+        key = self._key(prompt, llm_string)
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT key, value, latency, created FROM responses WHERE key = ?",
+                (key,)).fetchone()
+            tier = "hits"
+            if (row is None or self._expired(row[3], now)) and self.embedder is not None:
+                row = self._semantic_lookup(prompt, llm_string, now)
+                tier = "semantic_hits"
+
+            if row is None or self._expired(row[3], now):
+                self.statistics["misses"] += 1
+                self._add_pending(key)
+                return None
+
+            self._connection.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (now, row[0]))
+            self._connection.commit()
+            self.statistics[tier] += 1
+            self.statistics["saved_seconds"] += row[2]
+        logger.debug("LLM cache %s", tier[:-1].replace('_', ' '))
+        return loads(row[1], allowed_objects=CACHED_CLASSES)
+
+    def _add_pending(self, key: str):
+        started = time.perf_counter()
+        self._pending.pop(key, None)
+        while self._pending and (len(self._pending) >= PENDING_MAX_ENTRIES or
+                                 started - next(iter(self._pending.values())) > PENDING_MAX_AGE):
+            del self._pending[next(iter(self._pending))]
+        self._pending[key] = started
+
+    def _semantic_lookup(self, prompt: str, llm_string: str, now: float):
+        rows = self._connection.execute(
+            "SELECT key, value, latency, created, vector FROM responses "
+            "WHERE llm_string = ? AND vector IS NOT NULL", (llm_string,)).fetchall()
+        rows = [row for row in rows if not self._expired(row[3], now)]
+        if not rows:
+            return None
+        query = np.asarray(self.embedder.embed_query(prompt), dtype=np.float32)
+        matrix = np.stack([np.frombuffer(row[4], dtype=np.float32) for row in rows])
+        scores = matrix @ query / np.maximum(
+            np.linalg.norm(matrix, axis=1) * np.linalg.norm(query), 1e-12)
+        best = int(np.argmax(scores))
+        return rows[best][:4] if scores[best] >= self.semantic_threshold else None
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        prompt = normalize_prompt(prompt)
+        key = self._key(prompt, llm_string)
+        vector = None
+        if self.embedder is not None:
+            vector = np.asarray(self.embedder.embed_query(prompt),
+                                dtype=np.float32).tobytes()
+        now = time.time()
+        with self._lock:
+            started = self._pending.pop(key, None)
+            latency = time.perf_counter() - started if started is not None else 0.0
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, llm_string, dumps(list(return_val)), vector, latency, now, now))
+            self._evict(now)
+            self._connection.commit()
+
+    def _evict(self, now: float):
+        if self.ttl is not None:
+            self.statistics["evictions"] += self._connection.execute(
+                "DELETE FROM responses WHERE created < ?", (now - self.ttl,)).rowcount
+        count = self._connection.execute(
+            "SELECT COUNT(*) FROM responses").fetchone()[0]
+        if count > self.max_entries:
+            self.statistics["evictions"] += self._connection.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,)).rowcount
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def stats(self) -> dict[str, float]:
+        """
+        Function that returns hit/miss counters, the hit rate and the model latency
+        saved by cache hits.
+        """
+        with self._lock:
+            statistics = dict(self.statistics)
+            statistics["entries"] = self._connection.execute(
+                "SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = statistics["hits"] + \
+            statistics["semantic_hits"] + statistics["misses"]
+        statistics["hit_rate"] = (lookups - statistics["misses"]) / \
+            lookups if lookups else 0.0
+        return statistics
+
+
+def create_llm_cache() -> LLMResponseCache | None:
+    """
+    Function that creates the cache shared by the agent models, or None when
+    `LLM_CACHE_PATH` is empty.
+    """
+    if not LLM_CACHE_PATH:
+        return None
+    embedder = None
+    if LLM_CACHE_SEMANTIC_THRESHOLD < 1:
+        from retrieval.embedding import HashEmbeddings
+
+        embedder = HashEmbeddings()
+    return LLMResponseCache(embedder=embedder)
+
+
+llm_cache = create_llm_cache()
@@ -1,17 +1,180 @@
+import atexit
+import copy
 import logging
+import multiprocessing
+import queue
+import reprlib
 import sys
+import threading
+from collections.abc import Mapping
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pydantic import BaseModel
+from utils.constants import LOG_PATH, LOG_LEVEL, LOG_CONSOLE_LEVEL, LOG_MAX_BYTES, LOG_BACKUP_COUNT, \
+    LOG_MAX_PAYLOAD, LOG_SAMPLE_FIRST, LOG_SAMPLE_EVERY
 
-logger = logging.getLogger("ComparaSuperAgent")
-logger.setLevel(logging.DEBUG)
+# Non-blocking logging: the calling thread only bounds the payload of a record (see
+# PayloadFilter below) and puts it on a queue, a listener thread formats it and writes it
+# to the console and to LOG_PATH, rotated at LOG_MAX_BYTES. Records below both levels are dropped by the
+# logger before their arguments are formatted, so call sites pass arguments instead of
+# building f-strings:
+#
+#   logger.debug("Files to create: %s", files)
+#
+# In debug records, large objects (file lists, stream chunks) are rendered with bounded
+# depth and length instead of their full repr and long strings are cut at
+# LOG_MAX_PAYLOAD characters. The debug records of a call site that keeps logging such
+# payloads are sampled: the first LOG_SAMPLE_FIRST, then one in LOG_SAMPLE_EVERY.
+#
+# Child processes (the spawned validation workers, which import `__main__` again) get
+# a logger without handlers: only the main process runs the listener and writes LOG_PATH.
 
-file_handler = logging.FileHandler("app.log")
-file_handler.setLevel(logging.DEBUG)
-file_handler.setFormatter(logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-logger.addHandler(file_handler)
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setLevel(logging.INFO)
-console_handler.setFormatter(logging.Formatter(
-    "%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
-logger.addHandler(console_handler)
+
+class PayloadRepr(reprlib.Repr):
+    """Bounded repr of log arguments, pydantic models (messages, files) included."""
+
+    def __init__(self, max_characters: int = LOG_MAX_PAYLOAD):
+        super().__init__()
+        self.maxlevel = 4
+        self.maxlist = self.maxtuple = self.maxset = self.maxdict = 10
+        self.maxstring = self.maxother = max_characters // 10
+        self.max_characters = max_characters
+
+    def repr1(self, x, level):
+        if isinstance(x, BaseModel):
+            if level <= 0:
+                return f"{type(x).__name__}(...)"
+            fields = list(x)
+            items = ", ".join(f"{name}={self.repr1(value, level - 1)}"
+                              for name, value in fields[:self.maxdict])
+            return f"{type(x).__name__}({items}{', ...' if len(fields) > self.maxdict else ''})"
+        return super().repr1(x, level)
+
+
+def truncate(value: str, max_characters: int = LOG_MAX_PAYLOAD) -> str:
+    if len(value) <= max_characters:
+        return value
+    return f"{value[:max_characters]}... ({len(value)} characters)"
+
+
+class PayloadFilter(logging.Filter):
+    """Truncates the payload of debug records and samples the large ones per call site."""
+
+    def __init__(self, max_characters: int = LOG_MAX_PAYLOAD,
+                 sample_first: int = LOG_SAMPLE_FIRST, sample_every: int = LOG_SAMPLE_EVERY):
+        super().__init__()
+        self.repr = PayloadRepr(max_characters)
+        self.max_characters = max_characters
+        self.sample_first = sample_first
+        self.sample_every = max(sample_every, 1)
+        self._large: dict[tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def shorten(self, value: object) -> tuple[object, bool]:
+        """
+        Function that returns the value to format in the message and whether it was
+        truncated.
+
+        Args:
+            value: object (message or argument of a record).
+        """
+        if value is None or isinstance(value, (int, float)):
+            return value, False
+        if isinstance(value, str):
+            text = value
+        elif isinstance(value, BaseException):
+            text = str(value)
+        else:
+            text = self.repr.repr(value)
+        return truncate(text, self.max_characters), len(text) > self.max_characters
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Info and above are few and meant to be read in full.
+        if record.levelno > logging.DEBUG:
+            return True
+        large = False
+        if not record.args:
+            record.msg, large = self.shorten(record.msg)
+        elif isinstance(record.args, Mapping):
+            # A single dictionary argument is kept as the record args by logging.
+            if "%(" in str(record.msg):
+                args = {key: self.shorten(value) for key, value in record.args.items()}
+                record.args = {key: value for key, (value, _) in args.items()}
+                large = any(truncated for _, truncated in args.values())
+            else:
+                arg, large = self.shorten(record.args)
+                record.args = (arg,)
+        else:
+            args = [self.shorten(arg) for arg in record.args]
+            record.args = tuple(arg for arg, _ in args)
+            large = any(truncated for _, truncated in args)
+        if not large:
+            return True
+
+        with self._lock:
+            count = self._large.get((record.pathname, record.lineno), 0) + 1
+            self._large[(record.pathname, record.lineno)] = count
+        return count <= self.sample_first or count % self.sample_every == 0
+
+
+class PayloadQueueHandler(QueueHandler):
+    """Queues records without formatting them, the listener's handlers do."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # QueueHandler.prepare formats the message on the calling thread. Debug arguments
+        # are already bounded strings; exceptions are rendered here since their traceback
+        # keeps the frames alive.
+        record = copy.copy(record)
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def create_logger(name: str) -> tuple[logging.Logger, QueueListener | None]:
+    """
+    Function that creates the logger writing through a queue and the listener writing
+    the queued records, already started. In a child process the logger drops its
+    records and there is no listener.
+
+    Args:
+        name: str (logger name).
+    """
+    logger = logging.getLogger(name)
+    logger.propagate = False
+    # Spawned processes import `__main__` before they know their parent, but after they
+    # are named.
+    if multiprocessing.current_process().name != "MainProcess":
+        logger.addHandler(logging.NullHandler())
+        return logger, None
+
+    formatter = logging.Formatter(FORMAT)
+    handlers = []
+    if LOG_PATH:
+        file_handler = RotatingFileHandler(LOG_PATH, maxBytes=LOG_MAX_BYTES,
+                                           backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+        file_handler.setLevel(LOG_LEVEL)
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setLevel(LOG_CONSOLE_LEVEL)
+    console_handler.setFormatter(formatter)
+    handlers.append(console_handler)
+
+    records = queue.SimpleQueue()
+    queue_handler = PayloadQueueHandler(records)
+    queue_handler.addFilter(PayloadFilter())
+
+    logger.setLevel(min(handler.level for handler in handlers))
+    logger.addHandler(queue_handler)
+
+    listener = QueueListener(records, *handlers, respect_handler_level=True)
+    listener.start()
+    # Writes the records still queued when the process exits.
+    atexit.register(listener.stop)
+    return logger, listener
+
+
+logger, listener = create_logger("ComparaSuperAgent")
@@ -0,0 +1,307 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+from uuid import UUID
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langgraph.errors import GraphBubbleUp
+from utils.constants import METRICS_PATH, METRICS_PROMETHEUS_PATH
+
+# Run metrics: latency histograms of graph nodes, tools, model calls and retrieval
+# stages, model token usage and retries. `MetricsHandler` collects the graph, tool
+# and model metrics from the LangChain callbacks, the retrieval code times itself
+# with `metrics.timer`. At the end of a run `metrics.export()` appends a JSON line
+# per series to METRICS_PATH, writes the Prometheus text format to
+# METRICS_PROMETHEUS_PATH and returns a summary to log.
+#
+# Model retries happen inside the Gemini client (google-genai retries with tenacity,
+# LangChain never sees them), which logs each one before sleeping. `RetryCounter`
+# counts those records, labeled with the model of the call running in the same
+# context.
+
+# Logger of the google-genai HTTP client and start of its tenacity retry records.
+GENAI_CLIENT_LOGGER = "google_genai._api_client"
+RETRY_MESSAGE = "Retrying "
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+Labels = tuple[tuple[str, str], ...]
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed buckets (in seconds)."""
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """
+        Function that returns the upper bound of the bucket holding the quantile.
+
+        Args:
+            q: float (quantile, between 0 and 1).
+        """
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+        return self.max
+
+
+class MetricsRegistry:
+    """Thread safe store of histograms and counters keyed by name and labels."""
+
+    def __init__(self):
+        self.histograms: dict[tuple[str, Labels], Histogram] = {}
+        self.counters: dict[tuple[str, Labels], float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict[str, str]) -> tuple[str, Labels]:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def observe(self, name: str, value: float, **labels: str):
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    def increment(self, name: str, value: float = 1, **labels: str):
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, name: str, **labels: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def records(self) -> list[dict[str, Any]]:
+        with self._lock:
+            records = [{"type": "histogram", "name": name, "labels": dict(labels),
+                        "count": histogram.count, "sum": histogram.sum, "max": histogram.max,
+                        "p50": histogram.quantile(0.5), "p95": histogram.quantile(0.95),
+                        "buckets": dict(zip(map(str, histogram.buckets + (float("inf"),)),
+                                            histogram.counts))}
+                       for (name, labels), histogram in self.histograms.items()]
+            records += [{"type": "counter", "name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in self.counters.items()]
+        return records
+
+    def prometheus(self) -> str:
+        """
+        Function that returns the metrics in the Prometheus text exposition format.
+        """
+        def format_labels(labels: Labels, extra: str = "") -> str:
+            items = [f'{key}="{value}"' for key, value in labels] + \
+                ([extra] if extra else [])
+            return "{" + ",".join(items) + "}" if items else ""
+
+        lines = []
+        with self._lock:
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (series, labels), histogram in self.histograms.items():
+                    if series != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else str(bound)
+                        bucket = format_labels(labels, f'le="{le}"')
+                        lines.append(f"{name}_bucket{bucket} {cumulative}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+            for name in sorted({name for name, _ in self.counters}):
+                lines.append(f"# TYPE {name} counter")
+                for (series, labels), value in self.counters.items():
+                    if series == name:
+                        lines.append(f"{name}{format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """
+        Function that returns a human readable table of the histograms, slowest
+        total first, followed by the counters.
+        """
+        records = self.records()
+        histograms = sorted((record for record in records if record["type"] == "histogram"),
+                            key=lambda record: record["sum"], reverse=True)
+        lines = [f"{'metric':<60} {'count':>6} {'total s':>9} {'p50 s':>7} {'p95 s':>7} {'max s':>7}"]
+        for record in histograms:
+            labels = ",".join(f"{key}={value}" for key, value in record["labels"].items())
+            lines.append(f"{record['name'] + '{' + labels + '}':<60} {record['count']:>6} "
+                         f"{record['sum']:>9.3f} {record['p50']:>7.3f} {record['p95']:>7.3f} "
+                         f"{record['max']:>7.3f}")
+        for record in records:
+            if record["type"] == "counter":
+                labels = ",".join(f"{key}={value}" for key, value in record["labels"].items())
+                lines.append(f"{record['name'] + '{' + labels + '}':<60} {record['value']:>6g}")
+        return "\n".join(lines)
+
+    def export(self, path: str = METRICS_PATH, prometheus_path: str = METRICS_PROMETHEUS_PATH) -> str:
+        """
+        Function that appends the metrics of the run to the JSON lines file, writes the
+        Prometheus file and returns the summary.
+
+        Args:
+            path: str (JSON lines file, one line per series, skipped when empty).
+            prometheus_path: str (Prometheus text file, skipped when empty).
+        """
+        run = time.strftime("%Y-%m-%dT%H:%M:%S")
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, mode='a', encoding='utf-8') as file:
+                for record in self.records():
+                    file.write(json.dumps({"run": run, **record}) + "\n")
+        if prometheus_path:
+            os.makedirs(os.path.dirname(prometheus_path) or ".", exist_ok=True)
+            with open(prometheus_path, mode='w', encoding='utf-8') as file:
+                file.write(self.prometheus())
+        return self.summary()
+
+
+metrics = MetricsRegistry()
+
+# Registry and labels of the model call running in the current context.
+_model_call: ContextVar[tuple[MetricsRegistry, dict[str, str]] | None] = \
+    ContextVar("model_call", default=None)
+
+
+class RetryCounter(logging.Handler):
+    """Counts the retries logged by the Gemini client."""
+
+    def emit(self, record: logging.LogRecord):
+        if not str(record.msg).startswith(RETRY_MESSAGE):
+            return
+        registry, labels = _model_call.get() or (metrics, {})
+        registry.increment("retries", **labels)
+
+
+_retry_counter = RetryCounter()
+
+
+def install_retry_counter():
+    client_logger = logging.getLogger(GENAI_CLIENT_LOGGER)
+    if _retry_counter not in client_logger.handlers:
+        # The retries are logged at INFO.
+        if not client_logger.isEnabledFor(logging.INFO):
+            client_logger.setLevel(logging.INFO)
+        client_logger.addHandler(_retry_counter)
+
+
+class MetricsHandler(BaseCallbackHandler):
+    """Callback handler timing graph nodes, tools and model calls."""
+
+    # Called in the thread and context of the event, not in an executor, so timings are
+    # not skewed and the retries of a model call are labeled with its model.
+    run_inline = True
+
+    def __init__(self, registry: MetricsRegistry = metrics):
+        self.registry = registry
+        self._runs: dict[UUID, tuple[str, dict[str, str], float]] = {}
+        self._lock = threading.Lock()
+        install_retry_counter()
+
+    def _start(self, run_id: UUID, name: str, **labels: str):
+        with self._lock:
+            self._runs[run_id] = (name, labels, time.perf_counter())
+
+    def _end(self, run_id: UUID, **extra: str) -> dict[str, str] | None:
+        with self._lock:
+            run = self._runs.pop(run_id, None)
+        if run is None:
+            return None
+        name, labels, start = run
+        self.registry.observe(name, time.perf_counter() - start, **labels, **extra)
+        return labels
+
+    def on_chain_start(self, serialized: dict[str, Any], inputs: dict[str, Any], *,
+                       run_id: UUID, metadata: dict[str, Any] | None = None, **kwargs: Any):
+        node = (metadata or {}).get("langgraph_node")
+        # Only the run of the node itself, not the runnables inside it.
+        if node is None or kwargs.get("name") != node:
+            return
+        # Path of the node in the graph and its subgraphs, e.g. supervisor/tools/agent.
+        namespace = (metadata or {}).get("langgraph_checkpoint_ns", "")
+        path = "/".join(part.split(":")[0] for part in namespace.split("|")
+                        if part and not part.isdigit()) or node
+        self._start(run_id, "graph_node_seconds", node=path)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        # Handoffs and interrupts are raised through the graph, they are not failures.
+        if isinstance(error, GraphBubbleUp):
+            self._end(run_id)
+        else:
+            self._end(run_id, status="error")
+
+    def on_tool_start(self, serialized: dict[str, Any], input_str: str, *,
+                      run_id: UUID, **kwargs: Any):
+        self._start(run_id, "tool_seconds", tool=(serialized or {}).get("name") or kwargs.get("name", ""))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id, status="error")
+
+    def on_chat_model_start(self, serialized: dict[str, Any], messages: list[list[Any]], *,
+                            run_id: UUID, metadata: dict[str, Any] | None = None, **kwargs: Any):
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name", "")
+        self._start(run_id, "llm_seconds", model=model)
+        _model_call.set((self.registry, {"model": model}))
+
+    def on_llm_start(self, serialized: dict[str, Any], prompts: list[str], *,
+                     run_id: UUID, metadata: dict[str, Any] | None = None, **kwargs: Any):
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name", "")
+        self._start(run_id, "llm_seconds", model=model)
+        _model_call.set((self.registry, {"model": model}))
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        labels = self._end(run_id)
+        if labels is None:
+            return
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage:
+                    continue
+                for kind in ("input_tokens", "output_tokens"):
+                    self.registry.increment(f"llm_{kind}", usage.get(kind, 0), **labels)
+        self.registry.increment("llm_calls", **labels)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        labels = self._end(run_id, status="error")
+        if labels is not None:
+            self.registry.increment("llm_errors", **labels)
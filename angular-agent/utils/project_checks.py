@@ -0,0 +1,142 @@
+import json
+import os
+import re
+from typing import Any
+
+# Per-file checks of the generated project, run in the validation worker processes
+# (see utils/validation.py). Only the standard library is imported here, so the
+# workers start quickly. Each check works on one file: it parses the JSON configs and
+# extracts the facts the cross-file checks need (relative imports, declared component
+# selectors and the custom elements used in templates).
+
+IMPORT_PATTERN = re.compile(
+    r"""(?:import|export)\s[^'";]*?from\s*['"]([^'"]+)['"]"""
+    r"""|import\s*\(\s*['"]([^'"]+)['"]\s*\)"""
+    r"""|import\s+['"]([^'"]+)['"]"""
+    r"""|templateUrl\s*:\s*['"]([^'"]+)['"]"""
+    r"""|styleUrl\s*:\s*['"]([^'"]+)['"]""")
+STYLE_URLS_PATTERN = re.compile(r"styleUrls\s*:\s*\[([^\]]*)\]")
+QUOTED_PATTERN = re.compile(r"""['"]([^'"]+)['"]""")
+RESOLVED_SUFFIXES = ("", ".ts", "/index.ts")
+
+SELECTOR_PATTERN = re.compile(r"""selector\s*:\s*['"`]([^'"`]+)['"`]""")
+INLINE_TEMPLATE_PATTERN = re.compile(r"template\s*:\s*`([^`]*)`", re.DOTALL)
+# Custom elements have a dash in their name.
+ELEMENT_PATTERN = re.compile(r"<([a-z][a-z0-9]*(?:-[a-z0-9]+)+)[\s/>]")
+BUILTIN_ELEMENTS = frozenset(("ng-container", "ng-template", "ng-content"))
+
+# tsconfig files are JSON with comments and trailing commas.
+JSON_COMMENT_PATTERN = re.compile(r'("(?:\\.|[^"\\])*")|//[^\n]*|/\*.*?\*/', re.DOTALL)
+TRAILING_COMMA_PATTERN = re.compile(r'("(?:\\.|[^"\\])*")|,(\s*[}\]])')
+
+# Keys a minimal config must have, by file name.
+REQUIRED_KEYS = {
+    "angular.json": ("version", "projects"),
+    "package.json": ("name", "dependencies"),
+    "tsconfig.json": ("compilerOptions",),
+}
+
+
+def parse_imports(content: str) -> list[str]:
+    """
+    Function that returns the relative module and resource specifiers of a file.
+
+    Args:
+        content: str (TypeScript source).
+    """
+    specifiers = [next(group for group in match.groups() if group)
+                  for match in IMPORT_PATTERN.finditer(content)]
+    for match in STYLE_URLS_PATTERN.finditer(content):
+        specifiers += QUOTED_PATTERN.findall(match.group(1))
+    return [specifier for specifier in specifiers if specifier.startswith(".")]
+
+
+def resolve_import(path: str, specifier: str, files) -> str | None:
+    """
+    Function that returns the file a relative specifier points to, None when it is
+    not one of the files.
+
+    Args:
+        path: str (file containing the import).
+        specifier: str (relative specifier, e.g. `./calculator/calculator`).
+        files: Container[str] (known files).
+    """
+    target = os.path.normpath(os.path.join(os.path.dirname(path), specifier))
+    for suffix in RESOLVED_SUFFIXES:
+        if target + suffix in files:
+            return target + suffix
+    return None
+
+
+def load_jsonc(content: str) -> Any:
+    content = JSON_COMMENT_PATTERN.sub(lambda match: match.group(1) or "", content)
+    content = TRAILING_COMMA_PATTERN.sub(lambda match: match.group(1) or match.group(2), content)
+    return json.loads(content)
+
+
+def check_json(path: str, content: str) -> tuple[list[dict], Any]:
+    name = os.path.basename(path)
+    try:
+        data = load_jsonc(content) if name.startswith("tsconfig") else json.loads(content)
+    except ValueError as e:
+        return [{"path": path, "severity": "error", "kind": "json",
+                 "message": f"invalid JSON: {e}"}], None
+
+    issues = []
+    missing = [key for key in REQUIRED_KEYS.get(name, ())
+               if not isinstance(data, dict) or key not in data]
+    if missing:
+        issues.append({"path": path, "severity": "error", "kind": "config",
+                       "message": f"missing {', '.join(missing)}"})
+    if name == "package.json" and isinstance(data, dict) and \
+            not (isinstance(data.get("dependencies"), dict)
+                 and "@angular/core" in data["dependencies"]):
+        issues.append({"path": path, "severity": "warning", "kind": "config",
+                       "message": "@angular/core is not a dependency"})
+    return issues, data
+
+
+def template_elements(template: str) -> list[str]:
+    return sorted({element for element in ELEMENT_PATTERN.findall(template)
+                   if element not in BUILTIN_ELEMENTS})
+
+
+def check_file(path: str, content: str) -> dict:
+    """
+    Function that checks one file and returns its issues and the facts used by the
+    cross-file checks.
+
+    Args:
+        path: str (absolute path of the file).
+        content: str (content of the file).
+    """
+    result = {"issues": [], "imports": [], "selectors": [], "elements": [], "prefixes": []}
+    if path.endswith(".json"):
+        result["issues"], data = check_json(path, content)
+        if os.path.basename(path) == "angular.json" and isinstance(data, dict):
+            projects = data.get("projects")
+            if isinstance(projects, dict):
+                result["prefixes"] = sorted({project["prefix"] for project in projects.values()
+                                             if isinstance(project, dict)
+                                             and isinstance(project.get("prefix"), str)})
+            elif projects is not None:
+                result["issues"].append({"path": path, "severity": "error", "kind": "config",
+                                         "message": "projects must be an object keyed by project name"})
+    elif path.endswith(".ts"):
+        result["imports"] = parse_imports(content)
+        result["selectors"] = [selector.strip() for selector in SELECTOR_PATTERN.findall(content)]
+        result["elements"] = template_elements(
+            "\n".join(INLINE_TEMPLATE_PATTERN.findall(content)))
+    elif path.endswith(".html"):
+        result["elements"] = template_elements(content)
+    return result
+
+
+def check_files(files: list[tuple[str, str]]) -> list[dict]:
+    """
+    Function that checks a batch of files, the unit of work of a worker process.
+
+    Args:
+        files: list[tuple[str, str]] (paths and contents).
+    """
+    return [check_file(path, content) for path, content in files]
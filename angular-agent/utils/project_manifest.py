@@ -0,0 +1,204 @@
+import os
+import threading
+from dataclasses import dataclass
+from utils.constants import PROJECT_OUTPUT, MANIFEST_MAX_CACHED_BYTES, MANIFEST_MAX_SNAPSHOTS
+from utils.file_writer import content_hash
+from utils.logger import logger
+
+# In-process manifest of the generated project tree. It is built with one
+# `os.scandir` walk on first use and kept up to date by the write tools, so
+# existence checks, reads and "what changed" queries do not touch every file.
+# Only the last MANIFEST_MAX_SNAPSHOTS snapshots are kept.
+
+
+@dataclass
+class ManifestEntry:
+    size: int
+    mtime_ns: int
+    sha256: str
+    # Cached text of small files, None for large or binary ones.
+    content: str | None = None
+
+
+class ProjectManifest:
+    """Path -> (size, mtime, content hash) index of a project directory."""
+
+    def __init__(self, root: str = PROJECT_OUTPUT,
+                 max_snapshots: int = MANIFEST_MAX_SNAPSHOTS):
+        self.root = os.path.abspath(root)
+        self.entries: dict[str, ManifestEntry] = {}
+        self.max_snapshots = max(max_snapshots, 1)
+        # Snapshot id -> path -> hash, oldest first.
+        self.snapshots: dict[int, dict[str, str]] = {}
+        self._next_snapshot = 0
+        self._scanned = False
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _key(path: str) -> str:
+        return os.path.abspath(path)
+
+    def scan(self):
+        """
+        Function that rebuilds the manifest with a single walk of the root directory.
+        """
+        entries = {}
+        stack = [self.root]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as iterator:
+                    for entry in iterator:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            entries[entry.path] = self._read_entry(
+                                entry.path, entry.stat())
+            except FileNotFoundError:
+                continue
+        with self._lock:
+            # Files recorded outside the root before the first scan are kept.
+            entries.update((path, entry) for path, entry in self.entries.items()
+                           if not path.startswith(self.root + os.sep))
+            self.entries = entries
+            self._scanned = True
+        logger.debug("Project manifest scanned %s files", len(entries))
+
+    def _ensure_scanned(self):
+        if not self._scanned:
+            self.scan()
+
+    @staticmethod
+    def _read_entry(path: str, stat: os.stat_result) -> ManifestEntry:
+        with open(path, mode='rb') as file:
+            data = file.read()
+        content = None
+        if len(data) <= MANIFEST_MAX_CACHED_BYTES:
+            try:
+                content = data.decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+        return ManifestEntry(size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                             sha256=content_hash(data), content=content)
+
+    def record(self, path: str, content: str | None = None):
+        """
+        Function that updates the entry of a file after it was written (or removes
+        it if it no longer exists).
+
+        Args:
+            path: str (path of the file).
+            content: str | None (content written, avoids reading the file back).
+        """
+        key = self._key(path)
+        try:
+            stat = os.stat(key)
+        except FileNotFoundError:
+            with self._lock:
+                self.entries.pop(key, None)
+            return
+        if content is not None and len(content) <= MANIFEST_MAX_CACHED_BYTES:
+            entry = ManifestEntry(size=stat.st_size, mtime_ns=stat.st_mtime_ns,
+                                  sha256=content_hash(content), content=content)
+        else:
+            entry = self._read_entry(key, stat)
+        with self._lock:
+            self.entries[key] = entry
+
+    def _exists(self, key: str) -> bool:
+        if key in self.entries:
+            return True
+        # Files outside the root are not scanned, ask the file system.
+        return not key.startswith(self.root + os.sep) and os.path.isfile(key)
+
+    def exists(self, path: str) -> bool:
+        with self._lock:
+            self._ensure_scanned()
+            return self._exists(self._key(path))
+
+    def missing(self, paths: list[str]) -> list[str]:
+        """
+        Function that returns the paths that are not in the manifest.
+
+        Args:
+            paths: list[str] (paths to check).
+        """
+        with self._lock:
+            self._ensure_scanned()
+            return [path for path in paths if not self._exists(self._key(path))]
+
+    def files(self) -> dict[str, ManifestEntry]:
+        """
+        Function that returns a copy of the entries, keyed by absolute path.
+        """
+        with self._lock:
+            self._ensure_scanned()
+            return dict(self.entries)
+
+    def get(self, path: str) -> ManifestEntry | None:
+        with self._lock:
+            self._ensure_scanned()
+            return self.entries.get(self._key(path))
+
+    def read(self, path: str) -> str:
+        """
+        Function that returns the content of a file, from the manifest when the file
+        did not change since it was recorded.
+
+        Args:
+            path: str (path of the file).
+        """
+        key = self._key(path)
+        entry = self.get(key)
+        stat = os.stat(key)
+        if entry is not None and entry.content is not None and \
+                entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            return entry.content
+
+        entry = self._read_entry(key, stat)
+        with self._lock:
+            self.entries[key] = entry
+        if entry.content is not None:
+            return entry.content
+        with open(key, mode='r', encoding='utf-8') as file:
+            return file.read()
+
+    def snapshot(self) -> int:
+        """
+        Function that records the current hashes and returns the snapshot id to pass
+        to `changed_since`. The oldest snapshot is dropped once there are more than
+        `max_snapshots`.
+        """
+        with self._lock:
+            self._ensure_scanned()
+            snapshot = self._next_snapshot
+            self._next_snapshot += 1
+            self.snapshots[snapshot] = {path: entry.sha256
+                                        for path, entry in self.entries.items()}
+            while len(self.snapshots) > self.max_snapshots:
+                del self.snapshots[next(iter(self.snapshots))]
+            return snapshot
+
+    def changed_since(self, snapshot: int) -> dict[str, list[str]]:
+        """
+        Function that returns the files added, modified and removed since a snapshot.
+        Raises KeyError for ids that were never returned by `snapshot` or were dropped.
+
+        Args:
+            snapshot: int (id returned by `snapshot`).
+        """
+        with self._lock:
+            self._ensure_scanned()
+            if snapshot not in self.snapshots:
+                raise KeyError(f"Unknown snapshot {snapshot}")
+            before = self.snapshots[snapshot]
+            current = {path: entry.sha256 for path,
+                       entry in self.entries.items()}
+        return {
+            "added": sorted(current.keys() - before.keys()),
+            "modified": sorted(path for path in current.keys() & before.keys()
+                               if current[path] != before[path]),
+            "removed": sorted(before.keys() - current.keys()),
+        }
+
+
+project_manifest = ProjectManifest()
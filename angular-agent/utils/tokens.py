@@ -0,0 +1,11 @@
+# Gemini does not ship an offline tokenizer, so token counts are estimated from the
+# text length (about four characters per token for English prose and code).
+CHARACTERS_PER_TOKEN = 4
+
+
+def count_tokens(text: str) -> int:
+    return (len(text) + CHARACTERS_PER_TOKEN - 1) // CHARACTERS_PER_TOKEN
+
+
+def truncate_to_tokens(text: str, tokens: int) -> str:
+    return text[:max(tokens, 0) * CHARACTERS_PER_TOKEN]
@@ -0,0 +1,156 @@
+import atexit
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from schemas.validation import ValidationIssue, ValidationReport
+from utils.constants import VALIDATION_WORKERS, VALIDATION_MIN_PARALLEL_FILES
+from utils.metrics import metrics
+from utils.project_checks import check_files, resolve_import
+from utils.project_manifest import ProjectManifest, project_manifest
+from utils.logger import logger
+
+# Deterministic validation of the generated project, run after the files are written
+# instead of asking the model to review them. The per-file checks (utils/project_checks.py)
+# parse the JSON configs and extract the imports, selectors and elements of each
+# component; their results are kept per content hash, so only changed files are checked
+# again. The cross-file checks run on those results:
+#
+#   - relative imports, templateUrl and styleUrl(s) pointing to files that do not exist,
+#   - elements with the project prefix (angular.json, `app` by default) that no component
+#     declares,
+#   - selectors declared by more than one component.
+#
+# A process pool costs more to start than checking a few dozen files, so the changed
+# files are only sent to worker processes when there are VALIDATION_MIN_PARALLEL_FILES
+# of them. The pool is created the first time it is needed, shared by the validators of
+# every workspace (utils/workspace.py) and shut down at exit. Its workers are spawned:
+# they import `__main__` again (agent.py and its modules, without starting the logging
+# listener, see utils/logger.py) and run the checks of utils/project_checks.py.
+
+CHECKED_SUFFIXES = (".json", ".ts", ".html")
+DEFAULT_PREFIX = "app"
+
+# Worker count -> process pool.
+_pools: dict[int, ProcessPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    with _pools_lock:
+        if workers not in _pools:
+            # Forking this process (logging listener, file writer and asyncio threads)
+            # could deadlock a worker on a lock held by another thread.
+            _pools[workers] = ProcessPoolExecutor(max_workers=workers,
+                                                  mp_context=multiprocessing.get_context("spawn"))
+            atexit.register(_pools[workers].shutdown)
+        return _pools[workers]
+
+
+class ProjectValidator:
+    """Checks the project files in the manifest and reports their issues."""
+
+    def __init__(self, manifest: ProjectManifest = project_manifest,
+                 workers: int = VALIDATION_WORKERS,
+                 min_parallel_files: int = VALIDATION_MIN_PARALLEL_FILES):
+        self.manifest = manifest
+        self.workers = max(workers, 1)
+        self.min_parallel_files = min_parallel_files
+        # Path -> hash of the content checked and result of the per-file checks.
+        self._checked: dict[str, tuple[str, dict]] = {}
+        self._lock = threading.Lock()
+
+    def _check(self, files: list[tuple[str, str]]) -> list[dict]:
+        if len(files) < self.min_parallel_files or self.workers == 1:
+            return check_files(files)
+        # A few batches per worker balance the load without pickling every file apart.
+        size = -(-len(files) // (self.workers * 4))
+        batches = [files[i:i + size] for i in range(0, len(files), size)]
+        return [result for batch in _get_pool(self.workers).map(check_files, batches)
+                for result in batch]
+
+    def _read(self, path: str, entry) -> str:
+        try:
+            return entry.content if entry.content is not None else self.manifest.read(path)
+        except (OSError, UnicodeDecodeError):
+            return ""
+
+    def validate(self, root: str | None = None) -> ValidationReport:
+        """
+        Function that validates the files of a project and returns the report.
+
+        Args:
+            root: str | None (project directory, the manifest root when None).
+        """
+        start = time.perf_counter()
+        root = os.path.abspath(root or self.manifest.root)
+        files = self.manifest.files()
+        entries = {path: entry for path, entry in files.items()
+                   if path.startswith(root + os.sep) and path.endswith(CHECKED_SUFFIXES)}
+        with self._lock:
+            changed = [(path, entry.sha256) for path, entry in entries.items()
+                       if self._checked.get(path, ("",))[0] != entry.sha256]
+            if changed:
+                results = self._check([(path, self._read(path, entries[path]))
+                                       for path, _ in changed])
+                for (path, sha256), result in zip(changed, results):
+                    self._checked[path] = (sha256, result)
+            for path in [path for path in self._checked
+                         if path.startswith(root + os.sep) and path not in entries]:
+                del self._checked[path]
+            checked = {path: self._checked[path][1] for path in entries}
+
+        issues = self._cross_check(checked, files)
+        for result in checked.values():
+            issues += [ValidationIssue(**issue) for issue in result["issues"]]
+        issues.sort(key=lambda issue: (issue.severity != "error", issue.path, issue.kind))
+
+        errors = sum(issue.severity == "error" for issue in issues)
+        report = ValidationReport(valid=errors == 0, files=len(checked), errors=errors,
+                                  warnings=len(issues) - errors,
+                                  seconds=time.perf_counter() - start, issues=issues)
+        metrics.observe("validation_seconds", report.seconds)
+        for severity, count in (("error", report.errors), ("warning", report.warnings)):
+            if count:
+                metrics.increment("validation_issues", count, severity=severity)
+        logger.debug("Validated %s files (%s changed) in %.3f s: %s errors, %s warnings",
+                     report.files, len(changed), report.seconds, report.errors, report.warnings)
+        return report
+
+    @staticmethod
+    def _cross_check(checked: dict[str, dict], files: dict) -> list[ValidationIssue]:
+        issues = []
+        for path, result in checked.items():
+            for specifier in result["imports"]:
+                if resolve_import(path, specifier, files) is None:
+                    issues.append(ValidationIssue(
+                        path=path, kind="import", severity="error",
+                        message=f"{specifier} does not resolve to a project file"))
+
+        declared: dict[str, list[str]] = {}
+        for path, result in checked.items():
+            for selectors in result["selectors"]:
+                for selector in selectors.split(","):
+                    selector = selector.strip()
+                    # Element selectors only, attribute and class selectors are not tags.
+                    if selector and selector[0].isalpha():
+                        declared.setdefault(selector, []).append(path)
+        for selector, paths in declared.items():
+            for path in paths[1:]:
+                issues.append(ValidationIssue(
+                    path=path, kind="selector", severity="warning",
+                    message=f"selector {selector} is also declared in {paths[0]}"))
+
+        prefixes = {prefix for result in checked.values() for prefix in result["prefixes"]}
+        prefixes = tuple(f"{prefix}-" for prefix in prefixes or (DEFAULT_PREFIX,))
+        for path, result in checked.items():
+            for element in result["elements"]:
+                if element.startswith(prefixes) and element not in declared:
+                    issues.append(ValidationIssue(
+                        path=path, kind="element", severity="error",
+                        message=f"<{element}> is not the selector of any component"))
+        return issues
+
+
+project_validator = ProjectValidator()
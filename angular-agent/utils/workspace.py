@@ -0,0 +1,75 @@
+import os
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from utils.constants import PROJECT_OUTPUT
+from utils.dependency_map import DependencyMap, dependency_map
+from utils.file_stream import StreamedFiles, streamed_files
+from utils.project_manifest import ProjectManifest, project_manifest
+from utils.validation import ProjectValidator, project_validator
+
+# Per-session state of the generated project. Every generation session (thread id)
+# writes its project to its own directory under PROJECT_OUTPUT, with its own project
+# manifest, dependency map, validator and streamed file writes, so the sessions served
+# concurrently by one process never see each other's files:
+#
+#   with use_workspace(Workspace.for_thread(thread_id)):
+#       await graph.astream(...)
+#
+# The workspace is a context variable, inherited by the asyncio tasks of the graph and
+# by `asyncio.to_thread`. Outside a session the default workspace, rooted at
+# PROJECT_OUTPUT, is used.
+
+
+class Workspace:
+    """Project root of a session and the state derived from its files."""
+
+    def __init__(self, root: str, manifest: ProjectManifest | None = None,
+                 dependencies: DependencyMap | None = None,
+                 validator: ProjectValidator | None = None,
+                 files: StreamedFiles | None = None):
+        self.root = os.path.abspath(root)
+        self.manifest = manifest or ProjectManifest(self.root)
+        self.dependency_map = dependencies or DependencyMap(self.manifest)
+        self.validator = validator or ProjectValidator(self.manifest)
+        self.streamed_files = files or StreamedFiles(self.manifest)
+
+    @classmethod
+    def for_thread(cls, thread_id: str) -> "Workspace":
+        """
+        Function that returns a new workspace for a session, in the PROJECT_OUTPUT
+        directory named after its thread id (the same one when a session is resumed).
+
+        Args:
+            thread_id: str (conversation id of the session).
+        """
+        if not thread_id or thread_id in (".", "..") or os.path.basename(thread_id) != thread_id:
+            raise ValueError(f"Thread id {thread_id!r} is not a valid directory name")
+        return cls(os.path.join(PROJECT_OUTPUT, thread_id))
+
+    def close(self):
+        self.streamed_files.close()
+
+
+default_workspace = Workspace(PROJECT_OUTPUT, project_manifest, dependency_map,
+                              project_validator, streamed_files)
+_current: ContextVar[Workspace] = ContextVar("workspace", default=default_workspace)
+
+
+def current_workspace() -> Workspace:
+    return _current.get()
+
+
+@contextmanager
+def use_workspace(workspace: Workspace) -> Iterator[Workspace]:
+    """
+    Function that makes a workspace the current one for the code run in the block.
+
+    Args:
+        workspace: Workspace (workspace of the session).
+    """
+    token = _current.set(workspace)
+    try:
+        yield workspace
+    finally:
+        _current.reset(token)